@@ -1,90 +1,261 @@
 # ai_analysis.py
 
-import os
+import json
+import asyncio
 import pandas as pd
-from openai import OpenAI  # Updated import for openai>=1.0.0
-from utils import portfolio, settings, secrets
+from utils import get_setting
+from snapshots import get_asset_snapshot
+from llm_client import chat_completion, estimate_tokens, get_max_output_tokens, LLMBudgetExceeded
+from notifications import send_telegram_message  # noqa: F401 (re-exported for callers)
 
-# Initialize OpenAI client with the API key from environment variables
-client = OpenAI(
-    api_key=secrets.get('openai_api_key')  # Optional: Defaults to environment variable
-)
+SUMMARY_MODEL = "gpt-3.5-turbo"
+SUMMARY_SYSTEM_MESSAGE = ("You are a financial assistant who provides precise, timely, and data-driven "
+                          "market insights without telling the user to watch or monitor anything.")
 
-# Verify that the OpenAI API key is set
-if not client.api_key:
-    raise ValueError("OPENAI_API_KEY is not set in the environment variables.")
+# Summaries that stand in for a failed or budget-blocked LLM call
+SUMMARY_FAILED = "Failed to generate summary."
+TEMPLATE_SUMMARY_NOTE = "(Indicator-only summary: the LLM budget for this run is exhausted.)"
 
-def generate_summary_for_asset(asset, source="portfolio", lookback_days=30):
+async def generate_summary_for_asset(asset, source="portfolio", lookback_days=30):
     """
     Generate a summary that uses historical data for context but focuses on immediate actionable insights.
     The heading of the message includes the asset and whether it's from the portfolio or watchlist.
+
+    Data loading runs in a worker thread and the OpenAI request goes through
+    the async LLM layer, so many summaries can be requested concurrently.
+    When the run's LLM budget is exhausted a template summary is returned.
     """
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_dir = os.path.join(base_dir, 'data')
+    context = await asyncio.to_thread(build_summary_context, asset, source, lookback_days)
+    if isinstance(context, str):
+        return context
 
-    asset_file = os.path.join(data_dir, f"{asset}_data.csv")
-    if not os.path.exists(asset_file):
-        print(f"No processed data file found for {asset}. Unable to generate summary.")
-        return "No data available."
+    try:
+        return await chat_completion(
+            model=SUMMARY_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": SUMMARY_SYSTEM_MESSAGE
+                },
+                {
+                    "role": "user",
+                    "content": context['prompt']
+                }
+            ],
+            max_tokens=1200,
+            temperature=0.7
+        )
+    except LLMBudgetExceeded as e:
+        print(f"{e} Using template summary for {asset}.")
+        return template_summary(context)
+    except asyncio.TimeoutError:
+        print(f"OpenAI API request for {asset} timed out.")
+        return SUMMARY_FAILED
+    except Exception as e:
+        print(f"OpenAI API request failed: {e}")
+        return SUMMARY_FAILED
 
-    df_asset = pd.read_csv(asset_file)
-    if df_asset.empty:
-        return "No data available."
+BATCH_SUMMARY_INSTRUCTIONS = """
+You are a top-tier financial analyst. Below are compact snapshots of several assets, one JSON object per line,
+with the latest close, the % change over the lookback window and the past year, daily volatility, RSI,
+MACD line/signal, and top news and Reddit titles.
+Assets with source "portfolio" are held: give a direct action such as "Add more now", "Hold at current levels",
+"Reduce your position by X%" or "Sell immediately". Assets with source "watchlist" are not held: give a direct action
+such as "Buy now", "Begin a small initial position", "Wait for a pullback before buying" or "Avoid entry at this time".
+For cryptocurrencies, mention volume, market cap and price change where relevant.
+Reference the exact indicator values. Do not tell the user to monitor or watch conditions.
 
-    # Set index based on available date column
-    if 'Date' in df_asset.columns:
-        df_asset['Date'] = pd.to_datetime(df_asset['Date'], errors='coerce')
-        df_asset.set_index('Date', inplace=True)
-    elif 'datetime' in df_asset.columns:
-        df_asset['datetime'] = pd.to_datetime(df_asset['datetime'], errors='coerce')
-        df_asset.set_index('datetime', inplace=True)
-    else:
-        print(f"No recognized date/datetime column in {asset} data. Cannot process.")
+Respond with a JSON object whose keys are the asset ids exactly as given and whose values are each asset's
+summary (a few sentences ending in the recommended action), with no heading.
+
+Assets:
+"""
+
+def is_fallback_summary(summary):
+    """
+    Whether a summary is an error message or indicator template rather than an LLM answer.
+    """
+    return summary == SUMMARY_FAILED or summary.endswith(TEMPLATE_SUMMARY_NOTE)
+
+def summary_batch_mode_enabled():
+    """
+    Whether daily_run.py summarizes assets in batches (settings.yaml: summary_mode).
+    """
+    return get_setting('summary_mode', 'per_asset') == 'batch'
+
+def asset_snapshot(context):
+    """
+    Compact one-line JSON snapshot of an asset's summary inputs for batch prompts.
+    """
+    def rounded(value):
+        return None if value is None or pd.isna(value) else round(float(value), 2)
+
+    return json.dumps({
+        'asset': context['asset'],
+        'source': context['source'],
+        'close': rounded(context['close']),
+        f"change_{context['lookback_days']}d_pct": rounded(context['pct_change_recent']),
+        'change_1y_pct': rounded(context['pct_change_year']),
+        'daily_volatility_pct': rounded(context['volatility']),
+        'rsi': rounded(context['rsi_value']),
+        'macd': [rounded(context['macd_line']), rounded(context['macd_signal'])],
+        'news': [h.get('title') for h in context['news_headlines'][:3]],
+        'reddit': [p.get('title') for p in context['reddit_posts'][:3]],
+    }, ensure_ascii=False)
+
+def plan_summary_batches(snapshots):
+    """
+    Split (asset, snapshot) pairs into batches whose prompt plus expected
+    answers fit the model context (summary_batch_context_tokens), with at
+    most summary_batch_max_assets per batch and no more assets than the
+    model's completion limit has room to answer.
+    """
+    context_tokens = int(get_setting('summary_batch_context_tokens', 16000))
+    output_tokens = int(get_setting('summary_batch_output_tokens', 250))
+    max_assets = max(1, int(get_setting('summary_batch_max_assets', 25)))
+    max_assets = min(max_assets, max(1, get_max_output_tokens(SUMMARY_MODEL) // output_tokens))
+    base_tokens = estimate_tokens([{'content': SUMMARY_SYSTEM_MESSAGE}, {'content': BATCH_SUMMARY_INSTRUCTIONS}])
+
+    batches, batch, used = [], [], base_tokens
+    for asset, snapshot in snapshots:
+        needed = estimate_tokens([{'content': snapshot}]) + output_tokens
+        if batch and (used + needed > context_tokens or len(batch) >= max_assets):
+            batches.append(batch)
+            batch, used = [], base_tokens
+        batch.append((asset, snapshot))
+        used += needed
+    if batch:
+        batches.append(batch)
+    return batches
+
+async def _summarize_batch(batch, contexts):
+    """
+    Summarize one batch with a single JSON-mode request. Returns {asset: summary}
+    for the assets the response covered.
+    """
+    prompt = BATCH_SUMMARY_INSTRUCTIONS + "\n".join(snapshot for _, snapshot in batch)
+    output_tokens = int(get_setting('summary_batch_output_tokens', 250))
+    response = await chat_completion(
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": SUMMARY_SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt},
+        ],
+        max_tokens=min(output_tokens * len(batch), get_max_output_tokens(SUMMARY_MODEL)),
+        temperature=0.7,
+        response_format={"type": "json_object"},
+    )
+    try:
+        answers = json.loads(response)
+    except ValueError as e:
+        print(f"Batch summary response was not valid JSON: {e}")
+        return {}
+
+    summaries = {}
+    for asset, _ in batch:
+        text = answers.get(asset) if isinstance(answers, dict) else None
+        if isinstance(text, str) and text.strip():
+            context = contexts[asset]
+            summaries[asset] = f"{asset.upper()} ({context['source'].capitalize()})\n{text.strip()}"
+    return summaries
+
+async def generate_summaries_batch(assets, lookback_days=30):
+    """
+    Summarize many assets with one LLM request per batch instead of one per
+    asset. `assets` is a list of (asset, source) pairs; returns {asset: summary}.
+
+    Each batch packs compact snapshots into one prompt and asks for a JSON
+    object keyed by asset. Assets missing from a response, or whose batch
+    failed, fall back to generate_summary_for_asset; once the LLM budget is
+    exhausted they get the template summary.
+    """
+    loaded = await asyncio.gather(*(asyncio.to_thread(build_summary_context, asset, source, lookback_days)
+                                    for asset, source in assets))
+    summaries, contexts = {}, {}
+    for (asset, _), context in zip(assets, loaded):
+        if isinstance(context, str):
+            summaries[asset] = context
+        else:
+            contexts[asset] = context
+
+    batches = plan_summary_batches([(asset, asset_snapshot(ctx)) for asset, ctx in contexts.items()])
+    if batches:
+        print(f"Summarizing {len(contexts)} assets in {len(batches)} batch request(s)...")
+
+    async def run_batch(batch):
+        try:
+            return await _summarize_batch(batch, contexts)
+        except LLMBudgetExceeded as e:
+            print(f"{e} Using template summaries for {len(batch)} assets.")
+            return {asset: template_summary(contexts[asset]) for asset, _ in batch}
+        except Exception as e:
+            print(f"Batch summary request failed: {e}")
+            return {}
+
+    for result in await asyncio.gather(*(run_batch(batch) for batch in batches)):
+        summaries.update(result)
+
+    missing = [asset for asset in contexts if asset not in summaries]
+    if missing:
+        print(f"No batch summary for {missing}; summarizing them individually.")
+        singles = await asyncio.gather(*(generate_summary_for_asset(asset, contexts[asset]['source'], lookback_days)
+                                         for asset in missing))
+        summaries.update(zip(missing, singles))
+    return summaries
+
+def template_summary(context):
+    """
+    Plain summary of the latest indicators, used when no LLM call is made.
+    """
+    def fmt(value):
+        return "n/a" if value is None or pd.isna(value) else f"{value:.2f}"
+
+    lines = [
+        f"{context['asset'].upper()} ({context['source'].capitalize()})",
+        f"Close: {fmt(context['close'])}",
+        f"Change over {context['lookback_days']} days: {fmt(context['pct_change_recent'])}%",
+        f"RSI: {fmt(context['rsi_value'])}",
+        f"MACD line/signal: {fmt(context['macd_line'])} / {fmt(context['macd_signal'])}",
+        TEMPLATE_SUMMARY_NOTE,
+    ]
+    return "\n".join(lines)
+
+def build_summary_context(asset, source="portfolio", lookback_days=30):
+    """
+    Build the LLM prompt for an asset from its snapshot record (written by
+    process_data.py), so the cost does not grow with the stored history.
+    Returns a dict with the prompt and the latest indicator values, or a
+    message string when there is not enough data to summarize.
+    """
+    snapshot = get_asset_snapshot(asset)
+    if snapshot is None:
+        print(f"No processed data file found for {asset}. Unable to generate summary.")
         return "No data available."
 
-    df_asset.sort_index(inplace=True)
+    market = snapshot.get('market') or {}
+    if market.get('close') is None:
+        return "No close price data available."
 
     # Extract indicators
-    latest = df_asset.iloc[-1]
-    rsi_value = next((latest[c] for c in df_asset.columns if 'RSI' in c), None)
-    macd_line = latest['MACD_line'] if 'MACD_line' in df_asset.columns else None
-    macd_signal = latest['MACD_signal'] if 'MACD_signal' in df_asset.columns else None
+    indicators = market.get('indicators') or {}
+    rsi_value = next((value for column, value in indicators.items() if 'RSI' in column), None)
+    macd_line = indicators.get('MACD_line')
+    macd_signal = indicators.get('MACD_signal')
 
-    close_prices = df_asset['Close'].dropna()
-    if close_prices.empty:
-        return "No close price data available."
+    # Short- and long-term performance
+    returns = market.get('returns_pct') or {}
+    pct_change_recent = returns.get(str(lookback_days))
+    pct_change_year = returns.get('365')
+    volatility = market.get('daily_volatility_pct')
 
-    # Recent data for short-term view
-    end_date = df_asset.index[-1]
-    start_date = end_date - pd.Timedelta(days=lookback_days)
-    recent_data = close_prices[close_prices.index >= start_date]
+    news_headlines = snapshot.get('news') or []
+    reddit_posts = snapshot.get('reddit') or []
 
-    # Long-term data (about a year)
-    one_year_ago = end_date - pd.Timedelta(days=365)
-    long_term_data = close_prices[close_prices.index >= one_year_ago]
+    def fmt_pct(value):
+        return "n/a" if value is None else f"{value:.2f}%"
 
-    # Short-term performance
-    if len(recent_data) > 1:
-        start_price = recent_data.iloc[0]
-        end_price = recent_data.iloc[-1]
-        pct_change_recent = ((end_price - start_price) / start_price) * 100
-    else:
-        pct_change_recent = None
-
-    # Load news
-    news_file = os.path.join(data_dir, f"news_{asset}_data.csv")
-    news_headlines = []
-    if os.path.exists(news_file):
-        df_news = pd.read_csv(news_file)
-        news_headlines = df_news.head(5)[['title', 'description', 'url']].to_dict('records')
-
-    # Load Reddit
-    reddit_file = os.path.join(data_dir, f"reddit_{asset}_data.csv")
-    reddit_posts = []
-    if os.path.exists(reddit_file):
-        df_reddit = pd.read_csv(reddit_file)
-        df_reddit.sort_values('score', ascending=False, inplace=True)
-        reddit_posts = df_reddit.head(5)[['title', 'score', 'subreddit']].to_dict('records')
+    headlines = "\n".join(f"- {item.get('title')}" for item in news_headlines) or "- none"
+    posts = "\n".join(f"- {post.get('title')} (score {post.get('score')})" for post in reddit_posts) or "- none"
 
     # Source-based action context
     if source == "portfolio":
@@ -109,56 +280,39 @@ Heading: "{asset.upper()} ({source.capitalize()})"
 
 You have about a year of historical data and recent indicators for {asset}.
 Use long-term data to identify patterns that matter now, and short-term indicators (last {lookback_days} days) for immediate action.
+Long-term context: {fmt_pct(pct_change_year)} change over the past year, daily volatility {fmt_pct(volatility)} over the last month.
+Latest close {market['close']}, volume {market.get('volume')}, market cap {market.get('market_cap')}.
+
+Recent news headlines:
+{headlines}
+
+Top Reddit posts:
+{posts}
 
 Incorporate recent news and Reddit sentiment if relevant.
-Reference exact indicators (RSI={rsi_value}, MACD_line={macd_line}, MACD_signal={macd_signal}, ~{pct_change_recent:.2f}% recent change if available).
+Reference exact indicators (RSI={rsi_value}, MACD_line={macd_line}, MACD_signal={macd_signal}, ~{fmt_pct(pct_change_recent)} recent change if available).
 
 Your final recommendation must be a direct action:
 - If portfolio: e.g. "Add more now", "Hold at current levels", "Reduce your position by X%", or "Sell immediately".
-- For cryptocurrencies, include volume, market cap, and price change (~{pct_change_recent:.2f}% recent change if available).
+- For cryptocurrencies, include volume, market cap, and price change (~{fmt_pct(pct_change_recent)} recent change if available).
 - If watchlist: e.g. "Buy now", "Begin a small initial position", "Wait for a pullback before buying", or "Avoid entry at this time".
 
 Do not tell the user to monitor or watch conditions, as this analysis runs daily and the AI will surface changes as needed.
 Just give a direct, current action based on the synthesis of all data.
 """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a financial assistant who provides precise, timely, and data-driven market insights without telling the user to watch or monitor anything."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            max_tokens=1200,
-            temperature=0.7
-        )
-    except Exception as e:
-        print(f"OpenAI API request failed: {e}")
-        return "Failed to generate summary."
-
-    summary = response.choices[0].message.content.strip()
-    return summary
-
-def send_telegram_message(message, bot_token, chat_id):
-    """
-    Send a message to a Telegram chat using the provided bot token and chat ID.
-    """
-    import requests
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    params = {
-        "chat_id": chat_id,
-        "text": message,
-        "parse_mode": "Markdown"  # Optional: for better formatting
+    return {
+        'asset': asset,
+        'source': source,
+        'lookback_days': lookback_days,
+        'close': market['close'],
+        'pct_change_recent': pct_change_recent,
+        'pct_change_year': pct_change_year,
+        'volatility': volatility,
+        'rsi_value': rsi_value,
+        'macd_line': macd_line,
+        'macd_signal': macd_signal,
+        'news_headlines': news_headlines,
+        'reddit_posts': reddit_posts,
+        'prompt': prompt,
     }
-    try:
-        response = requests.post(url, params=params)
-        response.raise_for_status()
-        print("Message sent to Telegram.")
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to send message to Telegram: {e}")
@@ -0,0 +1,83 @@
+# assets.py
+
+from functools import lru_cache
+from typing import NamedTuple
+from utils import get_portfolio
+
+# portfolio.yaml section -> asset class, in pipeline order
+ASSET_CLASSES = {'stocks': 'stock', 'etfs': 'etf', 'crypto': 'crypto'}
+SOURCES = ('portfolio', 'watchlist')
+PROVIDERS = {'stock': 'yfinance', 'etf': 'yfinance', 'crypto': 'coingecko'}
+
+class Asset(NamedTuple):
+    symbol: str
+    asset_class: str   # stock, etf or crypto
+    source: str        # portfolio or watchlist
+    provider: str      # yfinance or coingecko
+    provider_id: str   # ticker or CoinGecko coin id
+
+@lru_cache(maxsize=None)
+def get_asset_registry():
+    """
+    Build the symbol -> Asset index from portfolio.yaml once per process.
+
+    Entries are plain symbols, or mappings like {symbol: btc, id: bitcoin}
+    when the provider ID differs from the symbol used for files and
+    messages. An asset listed in both sections counts as portfolio.
+    Iteration order is portfolio then watchlist, stocks, ETFs, crypto.
+    """
+    portfolio = get_portfolio()
+    registry = {}
+    for source in SOURCES:
+        section = portfolio.get(source) or {}
+        for key, asset_class in ASSET_CLASSES.items():
+            for entry in section.get(key) or []:
+                if isinstance(entry, dict):
+                    symbol = str(entry['symbol'])
+                    provider_id = str(entry.get('id', symbol))
+                else:
+                    symbol = provider_id = str(entry)
+                if symbol not in registry:
+                    registry[symbol] = Asset(symbol, asset_class, source, PROVIDERS[asset_class], provider_id)
+    return registry
+
+@lru_cache(maxsize=None)
+def _symbols_by(asset_class, source, provider):
+    return tuple(asset.symbol for asset in get_asset_registry().values()
+                 if (asset_class is None or asset.asset_class == asset_class)
+                 and (source is None or asset.source == source)
+                 and (provider is None or asset.provider == provider))
+
+def list_assets(asset_class=None, source=None, provider=None):
+    """
+    List symbols in registry order, optionally filtered by asset class,
+    source and/or data provider.
+    """
+    return list(_symbols_by(asset_class, source, provider))
+
+def get_asset(symbol):
+    """
+    Return the Asset for a symbol, or None if it is not in portfolio.yaml.
+    """
+    return get_asset_registry().get(symbol)
+
+def is_crypto(symbol):
+    """
+    Check if the asset is listed under crypto in either portfolio or watchlist.
+    """
+    asset = get_asset_registry().get(symbol)
+    return asset is not None and asset.asset_class == 'crypto'
+
+def get_asset_source(symbol):
+    """
+    Determine whether an asset comes from the portfolio or the watchlist.
+    """
+    asset = get_asset_registry().get(symbol)
+    return asset.source if asset is not None else "watchlist"
+
+def get_provider_id(symbol):
+    """
+    Return the ID the data provider knows the asset by (defaults to the symbol).
+    """
+    asset = get_asset_registry().get(symbol)
+    return asset.provider_id if asset is not None else symbol
@@ -0,0 +1,88 @@
+# benchmark_memory.py
+
+import os
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from indicators import compute_indicators, compute_panel_indicators
+from storage import compact_frame
+
+MB = 1024 ** 2
+
+def make_universe(assets=20, days=90, seed=0):
+    """
+    Build synthetic minute-resolution OHLCV frames (float64 prices, int64
+    volume) for `assets` symbols covering `days` days.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(days * 24 * 60)
+    index = pd.date_range("2024-01-01", periods=n, freq="min", name="Date")
+    frames = {}
+    for i in range(assets):
+        close = 100 + np.cumsum(rng.normal(0, 0.05, n))
+        spread = np.abs(rng.normal(0, 0.05, n))
+        frames[f"ASSET{i:04d}"] = pd.DataFrame({
+            'Open': close + rng.normal(0, 0.01, n),
+            'High': close + spread,
+            'Low': close - spread,
+            'Close': close,
+            'Volume': rng.integers(0, 1_000_000, n),
+        }, index=index)
+    return frames
+
+def frame_mb(frames):
+    return sum(df.memory_usage(deep=True).sum() for df in frames.values()) / MB
+
+def traced_peak_mb(func, *args, **kwargs):
+    """
+    Run func and return its peak traced allocation in MB (numpy arrays included).
+    """
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1] / MB
+    finally:
+        tracemalloc.stop()
+
+def parquet_mb(frames):
+    with tempfile.TemporaryDirectory() as tmp:
+        total = 0
+        for asset, df in frames.items():
+            path = os.path.join(tmp, f"{asset}.parquet")
+            df.to_parquet(path)
+            total += os.path.getsize(path)
+    return total / MB
+
+def run_memory_benchmark(assets=20, days=90):
+    """
+    Compare float64 frames against compact dtypes, and in-memory against
+    memory-mapped panel inputs, on synthetic minute bars.
+    """
+    frames = make_universe(assets, days)
+    rows = len(next(iter(frames.values())))
+    print(f"Universe: {assets} assets x {rows:,} minute bars ({days} days)")
+
+    processed = {asset: df.join(compute_indicators(df)) for asset, df in frames.items()}
+    compact = {asset: compact_frame(df) for asset, df in processed.items()}
+    columns = len(next(iter(processed.values())).columns)
+    print(f"Price + indicator frames ({columns} columns):")
+    print(f"  float64 in memory:     {frame_mb(processed):9.1f} MB")
+    print(f"  compact in memory:     {frame_mb(compact):9.1f} MB")
+    print(f"  float64 as parquet:    {parquet_mb(processed):9.1f} MB")
+    print(f"  compact as parquet:    {parquet_mb(compact):9.1f} MB")
+
+    print("Peak traced memory of panel indicator computation:")
+    in_memory = traced_peak_mb(compute_panel_indicators, compact)
+    with tempfile.TemporaryDirectory() as memmap_dir:
+        memmapped = traced_peak_mb(compute_panel_indicators, compact, memmap_dir=memmap_dir)
+    print(f"  in-memory panels:      {in_memory:9.1f} MB")
+    print(f"  memory-mapped panels:  {memmapped:9.1f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark memory use of price/indicator data on synthetic minute bars.")
+    parser.add_argument('--assets', type=int, default=20, help="Number of synthetic assets.")
+    parser.add_argument('--days', type=float, default=90, help="Days of minute bars per asset.")
+    args = parser.parse_args()
+    run_memory_benchmark(args.assets, args.days)
@@ -0,0 +1,595 @@
+# benchmark_pipeline.py
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import datetime
+import tempfile
+import zlib
+import resource
+import subprocess
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Universe sizes and bar resolutions benchmarked by default
+DEFAULT_SCALES = (10, 100, 1000)
+BAR_FREQUENCIES = {'daily': 'D', 'minute': 'min'}
+# Days of history served per asset unless --days is given (minute bars grow fast)
+DEFAULT_HISTORY_DAYS = {'daily': 365, 'minute': 7}
+
+# Asset classes of every ten synthetic assets (6 stocks, 1 ETF, 3 coins)
+UNIVERSE_MIX = ('stocks', 'stocks', 'crypto', 'stocks', 'etfs', 'stocks', 'crypto', 'stocks', 'crypto', 'stocks')
+
+# Recorded response bodies replayed instead of synthetic ones when present in --fixtures
+FIXTURE_FILES = {
+    'yfinance': 'yfinance.csv',
+    'coingecko_market_chart': 'coingecko_market_chart.json',
+    'coingecko_markets': 'coingecko_markets.json',
+    'newsapi': 'newsapi.json',
+    'reddit': 'reddit.json',
+    'openai': 'openai.json',
+    'telegram': 'telegram.json',
+}
+
+# Providers whose pacing is lifted unless --keep-limits is given
+PACED_PROVIDERS = ('coingecko', 'newsapi', 'reddit', 'telegram', 'openai')
+UNPACED = 1e9
+
+# Timings below these are too noisy to gate on: run and whole-run stage totals
+# (seconds), and per-asset stage means (milliseconds)
+MIN_GATED_SECONDS = 0.5
+MIN_GATED_MEAN_MS = 5.0
+
+def make_portfolio(count):
+    """
+    Build a synthetic portfolio.yaml of `count` assets: 60% stocks, 10% ETFs
+    and 30% crypto, with every fourth asset on the watchlist.
+    """
+    portfolio = {}
+    for i in range(count):
+        section = 'watchlist' if i % 4 == 3 else 'portfolio'
+        kind = UNIVERSE_MIX[i % len(UNIVERSE_MIX)]
+        symbol = {'stocks': f"STK{i:04d}", 'etfs': f"ETF{i:04d}", 'crypto': f"coin{i:04d}"}[kind]
+        portfolio.setdefault(section, {}).setdefault(kind, []).append(symbol)
+    return portfolio
+
+def load_fixtures(fixtures_dir):
+    """
+    Load the recorded responses found in `fixtures_dir` (see FIXTURE_FILES).
+    """
+    fixtures = {}
+    if not fixtures_dir:
+        return fixtures
+    for name, filename in FIXTURE_FILES.items():
+        path = os.path.join(fixtures_dir, filename)
+        if not os.path.exists(path):
+            continue
+        if filename.endswith('.csv'):
+            fixtures[name] = pd.read_csv(path, index_col=0, parse_dates=True)
+        else:
+            with open(path) as f:
+                fixtures[name] = json.load(f)
+    return fixtures
+
+class StandIns:
+    """
+    Local stand-ins for the external services: a yfinance.download
+    replacement, an httpx transport handler for CoinGecko, NewsAPI, OpenAI
+    and Telegram, and an asyncpraw-like Reddit client. Responses are the
+    recorded fixtures when given, otherwise synthetic, and each one waits
+    `latency_ms` to mimic the network.
+    """
+
+    def __init__(self, bars='daily', days=None, latency_ms=0.0, fixtures=None, seed=0):
+        self.freq = BAR_FREQUENCIES[bars]
+        self.days = days or DEFAULT_HISTORY_DAYS[bars]
+        self.latency = latency_ms / 1000.0
+        self.fixtures = fixtures or {}
+        self.seed = seed
+        self.requests = {}
+        # Days the stand-ins' clock runs behind; lowered to replay the next day's run
+        self.lag_days = 0
+
+    def now(self):
+        """
+        The stand-ins' current UTC time (naive), `lag_days` behind the real clock.
+        """
+        return pd.Timestamp.utcnow().tz_localize(None) - pd.Timedelta(days=self.lag_days)
+
+    def _count(self, provider):
+        self.requests[provider] = self.requests.get(provider, 0) + 1
+
+    def price_frame(self, key, start, end):
+        """
+        Synthetic OHLCV bars from `start` (capped to the last `days` days) up to `end`.
+        """
+        end = min(pd.Timestamp(end), self.now().normalize())
+        start = max(pd.Timestamp(start), end - pd.Timedelta(days=self.days))
+        index = pd.date_range(start, end, freq=self.freq, inclusive='left', name='Date')
+        rng = np.random.default_rng([self.seed, sum(map(ord, key))])
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+        spread = close * np.abs(rng.normal(0, 0.005, len(index)))
+        return pd.DataFrame({
+            'Open': close + rng.normal(0, 0.1, len(index)),
+            'High': close + spread,
+            'Low': close - spread,
+            'Close': close,
+            'Adj Close': close,
+            'Volume': rng.integers(1_000, 1_000_000, len(index)),
+        }, index=index)
+
+    def download(self, tickers, start=None, end=None, group_by='column', **kwargs):
+        """
+        Stand-in for yfinance.download, returning MultiIndex columns like yfinance does.
+        """
+        self._count('yfinance')
+        time.sleep(self.latency)
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        frames = {}
+        for ticker in symbols:
+            if 'yfinance' in self.fixtures:
+                frames[ticker] = self.fixtures['yfinance'].loc[start:end]
+            else:
+                frames[ticker] = self.price_frame(ticker, start, end)
+        df = pd.concat(frames, axis=1)
+        if group_by != 'ticker':
+            df = df.swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+        return df
+
+    def market_chart(self, coin_id, days):
+        if 'coingecko_market_chart' in self.fixtures:
+            return self.fixtures['coingecko_market_chart']
+        now = self.now()
+        df = self.price_frame(coin_id, now.normalize() - pd.Timedelta(days=days), now.normalize())
+
+        def series(values):
+            stamps = df.index.asi8 // 1_000_000
+            points = [[int(t), float(v)] for t, v in zip(stamps, values)]
+            # CoinGecko ends the series with a partial "now" point
+            return points + [[int(now.value // 1_000_000), float(values[-1])]] if points else points
+
+        return {
+            'prices': series(df['Close'].to_numpy()),
+            'total_volumes': series(df['Volume'].to_numpy(dtype=float)),
+            'market_caps': series(df['Close'].to_numpy() * 1e7),
+        }
+
+    def markets(self, ids):
+        if 'coingecko_markets' in self.fixtures:
+            return self.fixtures['coingecko_markets']
+        now = self.now().tz_localize('UTC').isoformat()
+        return [{'id': coin_id, 'current_price': 100.0 + random.random(), 'total_volume': 1e6,
+                 'market_cap': 1e9, 'last_updated': now} for coin_id in ids]
+
+    def news(self, query, limit, since=None):
+        if 'newsapi' in self.fixtures:
+            return self.fixtures['newsapi']
+        # One article an hour per query, each about one of its (OR-combined) symbols;
+        # URLs stay the same across runs, like real reposts
+        symbols = re.findall(r'"([^"]+)"', query) or query.split()[:1]
+        now = self.now().floor('h')
+        slug = zlib.crc32(query.encode('utf-8'))
+        articles = []
+        for i in range(limit):
+            published = now - datetime.timedelta(hours=i)
+            if since and published.strftime('%Y-%m-%dT%H:%M:%S') < since:
+                break
+            symbol = symbols[i % len(symbols)] if symbols else query
+            articles.append({
+                'title': f"{symbol}: headline {published:%Y%m%d%H}",
+                'description': f"Synthetic article about {symbol}.",
+                'url': f"https://example.com/{slug}/{published:%Y%m%d%H}",
+                'publishedAt': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            })
+        return {'status': 'ok', 'totalResults': len(articles), 'articles': articles}
+
+    def chat_completion(self, body):
+        if 'openai' in self.fixtures:
+            return self.fixtures['openai']
+        prompt = "\n".join(m.get('content') or '' for m in body['messages'])
+        if (body.get('response_format') or {}).get('type') == 'json_object':
+            # Batch summaries: answer every asset snapshot line of the prompt
+            answers = {}
+            for line in prompt.splitlines():
+                if line.startswith('{"asset"'):
+                    answers[json.loads(line)['asset']] = "Synthetic summary. Hold at current levels."
+            content = json.dumps(answers)
+        else:
+            content = "Synthetic summary. Hold at current levels."
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        return {
+            'id': 'chatcmpl-benchmark', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': body['model'],
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        }
+
+    async def handle(self, request):
+        """
+        httpx.MockTransport handler routing requests to the stand-in services.
+        """
+        import httpx
+
+        await asyncio.sleep(self.latency)
+        host, path, params = request.url.host, request.url.path, request.url.params
+        if host == 'api.coingecko.com' and path.endswith('/market_chart'):
+            self._count('coingecko')
+            return httpx.Response(200, json=self.market_chart(path.split('/')[-2], int(params.get('days', 365))))
+        if host == 'api.coingecko.com' and path.endswith('/coins/markets'):
+            self._count('coingecko')
+            return httpx.Response(200, json=self.markets(params.get('ids', '').split(',')))
+        if host == 'newsapi.org':
+            self._count('newsapi')
+            return httpx.Response(200, json=self.news(params.get('q', ''), int(params.get('pageSize', 20)),
+                                                      params.get('from')))
+        if host == 'api.openai.com':
+            self._count('openai')
+            return httpx.Response(200, json=self.chat_completion(json.loads(request.content)))
+        if host == 'api.telegram.org':
+            self._count('telegram')
+            return httpx.Response(200, json=self.fixtures.get('telegram', {'ok': True}))
+        return httpx.Response(404, json={'error': f"No stand-in for {host}{path}"})
+
+    def reddit_posts(self, name, limit):
+        if 'reddit' in self.fixtures:
+            return self.fixtures['reddit'][:limit]
+        created = time.time()
+        return [{'title': f"r/{name} post {i}", 'score': 100 - i, 'num_comments': i,
+                 'created_utc': created - i * 3600, 'url': f"https://reddit.com/r/{name}/{i}"}
+                for i in range(limit)]
+
+class StandInReddit:
+    """
+    The subset of asyncpraw.Reddit used by fetch_reddit.py.
+    """
+
+    def __init__(self, stand_ins):
+        self.stand_ins = stand_ins
+
+    async def subreddit(self, name):
+        stand_ins = self.stand_ins
+
+        async def hot(limit=20):
+            stand_ins._count('reddit')
+            await asyncio.sleep(stand_ins.latency)
+            for post in stand_ins.reddit_posts(name, limit):
+                yield SimpleNamespace(subreddit=SimpleNamespace(display_name=name), **post)
+
+        return SimpleNamespace(display_name=name, hot=hot)
+
+    async def close(self):
+        pass
+
+def configure(workdir, assets, overrides=None, keep_limits=False):
+    """
+    Point the pipeline at a synthetic universe and a scratch data directory,
+    fill in dummy credentials and apply setting overrides.
+    """
+    import yaml
+    import utils
+    import assets as asset_registry
+
+    os.environ['INVESTMENT_DATA_DIR'] = os.path.join(workdir, 'data')
+    utils.PORTFOLIO_FILE = os.path.join(workdir, 'portfolio.yaml')
+    with open(utils.PORTFOLIO_FILE, 'w') as f:
+        yaml.safe_dump(make_portfolio(assets), f)
+    utils.get_portfolio.cache_clear()
+    asset_registry.get_asset_registry.cache_clear()
+    asset_registry._symbols_by.cache_clear()
+
+    for key in ('openai_api_key', 'newsapi_key', 'telegram_bot_token', 'telegram_chat_id',
+                'reddit_client_id', 'reddit_client_secret', 'reddit_user_agent'):
+        utils.secrets[key] = 'benchmark'
+
+    settings = utils.get_settings().setdefault('settings', {})
+    if not keep_limits:
+        # Measure the pipeline itself, not the providers' quotas or the LLM budget
+        rate_limits = settings.get('rate_limits') or {}
+        settings['rate_limits'] = {provider: {**(rate_limits.get(provider) or {}),
+                                              'requests_per_minute': UNPACED, 'burst': UNPACED}
+                                   for provider in PACED_PROVIDERS}
+        settings['llm_tokens_per_minute'] = UNPACED
+        settings['llm_run_token_budget'] = 0
+        settings['llm_run_cost_budget_usd'] = 0
+    for override in overrides or []:
+        key, _, value = override.partition('=')
+        settings[key.strip()] = yaml.safe_load(value)
+
+def reset_run_state():
+    """
+    Drop the per-process state (token buckets, LLM limits and budget, cache
+    size estimate) that a real run starts without, so consecutive runs in one
+    process are independent.
+    """
+    import rate_limit
+    import llm_client
+    import llm_cache
+
+    rate_limit._buckets.clear()
+    llm_client._semaphore = None
+    llm_client._token_bucket = None
+    llm_client._budget = None
+    llm_cache._cache_bytes = None
+
+def stage_stats(report):
+    """
+    Per-stage totals and per-asset latency distribution from a metrics report.
+    """
+    import metrics
+
+    samples = {}
+    for asset, stages in report['assets'].items():
+        for name, entry in stages.items():
+            if entry['calls']:
+                samples.setdefault(name, []).append((asset, entry['seconds']))
+
+    stats = {}
+    for name, total in report['stages'].items():
+        seconds = np.array([s for _, s in samples.get(name, [])] or [0.0])
+        stats[name] = {
+            'calls': int(total['calls']),
+            'errors': int(total['errors']),
+            'skipped': int(total['skipped']),
+            'assets': len([a for a, _ in samples.get(name, []) if a != metrics.ALL_ASSETS]),
+            'total_s': float(total['seconds']),
+            'mean_ms': float(seconds.mean() * 1000),
+            'p95_ms': float(np.percentile(seconds, 95) * 1000),
+            'max_ms': float(seconds.max() * 1000),
+        }
+    return stats
+
+async def _run_job(job, stand_ins):
+    import httpx
+    import metrics
+    import http_client
+
+    reset_run_state()
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(stand_ins.handle))
+    http_client._reddit = StandInReddit(stand_ins)
+    requests_before = dict(stand_ins.requests)
+    start = time.perf_counter()
+    await job()
+    elapsed = time.perf_counter() - start
+
+    report = metrics.build_report()
+    totals = {counter: sum(s[counter] for s in report['stages'].values()) for counter in metrics.COUNTERS}
+    return {
+        'job': report['job'],
+        'seconds': elapsed,
+        'requests': {p: n - requests_before.get(p, 0) for p, n in stand_ins.requests.items()
+                     if n > requests_before.get(p, 0)},
+        'rows': int(totals['rows']),
+        'tokens': int(totals['tokens']),
+        'cache_hits': int(totals['cache_hits']),
+        'skipped': int(totals['skipped']),
+        'errors': int(totals['errors']),
+        'stages': stage_stats(report),
+    }
+
+def run_scenario(assets=10, bars='daily', days=None, runs=1, latency_ms=0.0,
+                 overrides=None, fixtures_dir=None, keep_limits=False, next_day=True):
+    """
+    Run daily_run `runs` times (the first cold, later ones resuming from
+    its checkpoints like a retried job) and then weekly_overview for a synthetic universe,
+    entirely against the stand-ins, in this process. Returns the timings.
+
+    With `next_day`, those runs see the services as of a day earlier, and
+    one more daily_run follows with the clock moved forward and the
+    same-day checkpoints cleared, like the next day's job: it fetches only
+    the new bars and articles and extends the stored indicators.
+    """
+    import yfinance
+    import daily_run
+    import weekly_overview
+    from checkpoints import get_checkpoint_db_path
+
+    # fetch_reddit.py logs every subreddit at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+    stand_ins = StandIns(bars, days, latency_ms, load_fixtures(fixtures_dir))
+    yfinance.download = stand_ins.download
+
+    with tempfile.TemporaryDirectory(prefix='benchmark_') as workdir:
+        configure(workdir, assets, overrides, keep_limits)
+        stand_ins.lag_days = 1 if next_day else 0
+        daily = [asyncio.run(_run_job(daily_run.main, stand_ins)) for _ in range(runs)]
+        next_day_run = None
+        if next_day:
+            stand_ins.lag_days = 0
+            # Checkpoints are keyed by the real date, which the stand-ins cannot move
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(get_checkpoint_db_path() + suffix):
+                    os.remove(get_checkpoint_db_path() + suffix)
+            next_day_run = asyncio.run(_run_job(daily_run.main, stand_ins))
+        weekly = asyncio.run(_run_job(weekly_overview.main, stand_ins))
+
+    for result in daily + ([next_day_run] if next_day_run else []):
+        result['assets_per_s'] = assets / result['seconds'] if result['seconds'] else 0.0
+    return {
+        'assets': assets,
+        'bars': bars,
+        'days': stand_ins.days,
+        'latency_ms': latency_ms,
+        'overrides': list(overrides or []),
+        'daily_runs': daily,
+        'next_day_run': next_day_run,
+        'weekly_overview': weekly,
+        # ru_maxrss is in KB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def scenario_key(result):
+    return f"{result['assets']}-{result['bars']}"
+
+def print_result(result):
+    print(f"\n{result['assets']} assets, {result['bars']} bars ({result['days']} days), "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    jobs = [(f"daily_run #{i + 1}", r) for i, r in enumerate(result['daily_runs'])]
+    if result.get('next_day_run'):
+        jobs.append(("daily_run next day", result['next_day_run']))
+    jobs.append(("weekly_overview", result['weekly_overview']))
+    for label, job in jobs:
+        throughput = f", {job['assets_per_s']:.1f} assets/s" if 'assets_per_s' in job else ""
+        requests = ", ".join(f"{p} {n}" for p, n in sorted(job['requests'].items()))
+        print(f"  {label}: {job['seconds']:.2f} s{throughput}; {job['rows']:,} rows, "
+              f"{job['tokens']:,} tokens, {job['cache_hits']} cache hits, {job['skipped']} stages resumed, "
+              f"{job['errors']} errors")
+        print(f"    requests: {requests or 'none'}")
+        print(f"    {'stage':<16} {'calls':>6} {'resumed':>8} {'total s':>9} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}")
+        for name, s in sorted(job['stages'].items(), key=lambda item: -item[1]['total_s']):
+            print(f"    {name:<16} {s['calls']:>6} {s['skipped']:>8} {s['total_s']:>9.2f} {s['mean_ms']:>9.1f} "
+                  f"{s['p95_ms']:>9.1f} {s['max_ms']:>9.1f}")
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    List regressions against a saved baseline: run wall times, per-asset
+    stage means (totals for whole-run stages such as bulk downloads) and
+    peak memory more than `tolerance` (a fraction) above the baseline.
+    Times under MIN_GATED_SECONDS (MIN_GATED_MEAN_MS for per-asset means)
+    are ignored as noise.
+    """
+    baseline = {scenario_key(r): r for r in baseline}
+    regressions = []
+
+    def check(label, current, previous, floor=MIN_GATED_SECONDS):
+        if max(current, previous) >= floor and current > previous * (1 + tolerance):
+            change = f" (+{(current / previous - 1) * 100:.0f}%)" if previous else ""
+            regressions.append(f"{label}: {previous:.2f} -> {current:.2f}{change}")
+
+    def check_stages(label, stages, old_stages):
+        for name, stats in stages.items():
+            old = old_stages.get(name)
+            if old is None:
+                continue
+            if stats['assets'] and old['assets']:
+                check(f"{label} {name} mean ms per asset", stats['mean_ms'], old['mean_ms'], floor=MIN_GATED_MEAN_MS)
+            else:
+                check(f"{label} {name} seconds", stats['total_s'], old['total_s'])
+
+    for result in results:
+        key = scenario_key(result)
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        check(f"{key} peak RSS MB", result['peak_rss_mb'], previous['peak_rss_mb'], floor=0)
+        jobs = [(f"{key} daily_run #{i + 1}", job, old)
+                for i, (job, old) in enumerate(zip(result['daily_runs'], previous['daily_runs']))]
+        if result.get('next_day_run') and previous.get('next_day_run'):
+            jobs.append((f"{key} daily_run next day", result['next_day_run'], previous['next_day_run']))
+        jobs.append((f"{key} weekly_overview", result['weekly_overview'], previous['weekly_overview']))
+        for label, job, old in jobs:
+            check(f"{label} seconds", job['seconds'], old['seconds'])
+            check_stages(label, job['stages'], old['stages'])
+    return regressions
+
+def run_in_subprocess(args, assets, bars, verbose=False):
+    """
+    Run one scenario in a fresh interpreter, so peak memory and module state
+    are per scenario. Pipeline output is discarded unless verbose.
+    """
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        result_file = f.name
+    command = [sys.executable, os.path.abspath(__file__), '--worker', result_file,
+               '--assets', str(assets), '--bars', bars, '--runs', str(args.runs),
+               '--latency-ms', str(args.latency_ms)]
+    if args.days:
+        command += ['--days', str(args.days)]
+    if args.fixtures:
+        command += ['--fixtures', os.path.abspath(args.fixtures)]
+    if args.keep_limits:
+        command.append('--keep-limits')
+    if args.no_next_day:
+        command.append('--no-next-day')
+    for override in args.set:
+        command += ['--set', override]
+    try:
+        completed = subprocess.run(command, cwd=SCRIPTS_DIR,
+                                   stdout=None if verbose else subprocess.DEVNULL,
+                                   stderr=None if verbose else subprocess.PIPE, text=True)
+        if completed.returncode != 0:
+            detail = (completed.stderr or '').strip().splitlines()[-1:] or ['see --verbose']
+            raise RuntimeError(f"Benchmark of {assets} assets ({bars} bars) failed: {detail[0]}")
+        with open(result_file) as f:
+            return json.load(f)
+    finally:
+        os.remove(result_file)
+
+def run_pipeline_benchmark(args):
+    """
+    Benchmark every requested scale and bar resolution, print the results,
+    optionally save them and gate against a baseline. Returns the exit code.
+    """
+    results = []
+    for bars in args.bars:
+        for assets in args.assets:
+            print(f"Benchmarking {assets} assets with {bars} bars...")
+            result = run_in_subprocess(args, assets, bars, args.verbose)
+            print_result(result)
+            results.append(result)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not {scenario_key(r) for r in results} & {scenario_key(r) for r in baseline}:
+            print(f"\nNo scenario of this run is in {args.baseline}; nothing to compare.")
+            return 0
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.tolerance:.0%} against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions over {args.tolerance:.0%} against {args.baseline}.")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark daily_run and weekly_overview end to end against local stand-ins "
+                    "for yfinance, CoinGecko, NewsAPI, Reddit, OpenAI and Telegram.")
+    parser.add_argument('--assets', type=int, nargs='+', default=list(DEFAULT_SCALES),
+                        help="Universe sizes to benchmark.")
+    parser.add_argument('--bars', nargs='+', choices=list(BAR_FREQUENCIES), default=['daily'],
+                        help="Bar resolutions served by the price stand-ins.")
+    parser.add_argument('--days', type=float, default=None,
+                        help="Days of history per asset (default: 365 daily, 7 minute).")
+    parser.add_argument('--runs', type=int, default=2,
+                        help="daily_run passes per scenario (the first is cold, later ones resume from its checkpoints).")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Simulated latency of every response.")
+    parser.add_argument('--fixtures', default=None, help="Directory of recorded responses to replay.")
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help="Override a setting from settings.yaml (value parsed as YAML).")
+    parser.add_argument('--keep-limits', action='store_true',
+                        help="Keep the configured rate limits and LLM budget instead of lifting them.")
+    parser.add_argument('--no-next-day', action='store_true',
+                        help="Skip the next-day daily_run (incremental fetch and indicator update).")
+    parser.add_argument('--save', default=None, help="Write the results as JSON to this file.")
+    parser.add_argument('--baseline', default=None, help="Fail if results regress against this saved JSON.")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown against the baseline.")
+    parser.add_argument('--verbose', action='store_true', help="Show the pipeline's own output.")
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # Run a single scenario and write its result for the parent process
+        result = run_scenario(args.assets[0], args.bars[0], args.days, args.runs, args.latency_ms,
+                              args.set, args.fixtures, args.keep_limits, not args.no_next_day)
+        with open(args.worker, 'w') as f:
+            json.dump(result, f)
+        sys.exit(0)
+    sys.exit(run_pipeline_benchmark(args))
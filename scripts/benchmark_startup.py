@@ -0,0 +1,80 @@
+# benchmark_startup.py
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Entry points and their startup budgets in milliseconds (interpreter start plus
+# module import). Jobs that never touch market data should not pay for pandas,
+# yfinance or asyncpraw.
+ENTRY_POINTS = {
+    'utils': 150,
+    'fetch_reddit': 400,
+    'process_data': 1000,
+    'ai_analysis': 1000,
+    'weekly_overview': 1000,
+    'fetch_data': 1200,
+    'daily_run': 1500,
+}
+
+def measure_startup(module):
+    """
+    Import `module` in a fresh interpreter. Returns the wall time in ms and
+    the -X importtime report as (cumulative_us, name) pairs.
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SCRIPTS_DIR, capture_output=True, text=True,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        imports.append((int(cumulative), name.strip()))
+    return elapsed, imports
+
+def run_startup_benchmark(modules, repeat=5, budget_ms=None, top=5):
+    """
+    Time each entry point's startup (best of `repeat`) against its budget
+    and list the heaviest top-level imports. Returns True if all fit.
+    """
+    within_budget = True
+    for module in modules:
+        best, imports = float('inf'), []
+        for _ in range(repeat):
+            elapsed, report = measure_startup(module)
+            if elapsed < best:
+                best, imports = elapsed, report
+        budget = budget_ms or ENTRY_POINTS.get(module, 1000)
+        status = "ok" if best <= budget else "OVER BUDGET"
+        within_budget &= best <= budget
+        print(f"{module:<16} {best:8.1f} ms  (budget {budget} ms)  {status}")
+
+        # Heaviest packages (top-level names) pulled in by the import
+        packages = {}
+        for cumulative, name in imports:
+            if '.' not in name and name != module:
+                packages[name] = max(packages.get(name, 0), cumulative)
+        heaviest = sorted(((us, name) for name, us in packages.items()), reverse=True)[:top]
+        for cumulative, name in heaviest:
+            print(f"    {name:<40} {cumulative / 1000:8.1f} ms")
+    return within_budget
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark import-time startup of the pipeline entry points.")
+    parser.add_argument('modules', nargs='*', default=list(ENTRY_POINTS), help="Modules to import (default: all entry points).")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per module (best is reported).")
+    parser.add_argument('--budget-ms', type=float, default=None, help="Override the per-module budgets.")
+    parser.add_argument('--top', type=int, default=5, help="Heaviest imports listed per module.")
+    args = parser.parse_args()
+    sys.exit(0 if run_startup_benchmark(args.modules, args.repeat, args.budget_ms, args.top) else 1)
@@ -0,0 +1,127 @@
+# checkpoints.py
+
+import os
+import json
+import sqlite3
+import hashlib
+import datetime
+from utils import get_setting
+from storage import get_data_dir, read_asset_data
+
+def checkpoints_enabled():
+    """
+    Whether daily_run.py resumes from stage checkpoints (settings.yaml: resume_from_checkpoints).
+    """
+    return bool(get_setting('resume_from_checkpoints', True))
+
+def get_checkpoint_db_path():
+    """
+    Return the path of the SQLite database holding stage checkpoints.
+    """
+    return os.path.join(get_data_dir(), 'checkpoints.db')
+
+def _connect():
+    """
+    Open the checkpoint database, creating the table on first use. WAL mode
+    and a busy timeout let concurrent pipelines write checkpoints safely.
+    """
+    conn = sqlite3.connect(get_checkpoint_db_path(), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            asset TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            input_hash TEXT NOT NULL,
+            output TEXT,
+            completed_at TEXT,
+            PRIMARY KEY (asset, stage)
+        )
+    """)
+    return conn
+
+def hash_inputs(*parts):
+    """
+    Stable SHA-256 of JSON-serializable stage inputs.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def fingerprint_file(path):
+    """
+    SHA-256 of a file's contents, or None if it does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def fingerprint_asset_data(asset):
+    """
+    Fingerprint of an asset's stored bars (row count and first/last
+    timestamp), or None if nothing is stored. Only the date index is read,
+    and indicator columns added by processing do not change it.
+    """
+    df = read_asset_data(asset, columns=[])
+    if df is None or len(df.index) == 0:
+        return None
+    return hash_inputs(len(df.index), df.index.min(), df.index.max())
+
+class CheckpointStore:
+    """
+    The last completed (input hash, output) of every asset stage, loaded
+    once per run. A stage whose input hash matches its checkpoint can be
+    skipped and its recorded output reused.
+    """
+
+    def __init__(self, checkpoints=None, enabled=True):
+        self.checkpoints = checkpoints or {}
+        self.enabled = enabled
+
+    @classmethod
+    def load(cls):
+        """
+        Read all checkpoints, or return a disabled store when resuming is switched off.
+        """
+        if not checkpoints_enabled():
+            return cls(enabled=False)
+        conn = _connect()
+        try:
+            rows = conn.execute("SELECT asset, stage, input_hash, output FROM checkpoints").fetchall()
+        finally:
+            conn.close()
+        return cls({(asset, stage): (input_hash, output) for asset, stage, input_hash, output in rows})
+
+    def get(self, asset, stage, input_hash):
+        """
+        Return the recorded output if the stage completed with these inputs,
+        else None.
+        """
+        checkpoint = self.checkpoints.get((asset, stage))
+        if checkpoint is None or checkpoint[0] != input_hash:
+            return None
+        return checkpoint[1]
+
+    def save(self, asset, stage, input_hash, output):
+        """
+        Record a completed stage (replacing its previous checkpoint).
+        """
+        if not self.enabled:
+            return
+        self.checkpoints[(asset, stage)] = (input_hash, output)
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO checkpoints (asset, stage, input_hash, output, completed_at) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(asset, stage) DO UPDATE SET input_hash = excluded.input_hash,
+                        output = excluded.output, completed_at = excluded.completed_at
+                    """,
+                    (asset, stage, input_hash, output,
+                     datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')),
+                )
+        finally:
+            conn.close()
@@ -2,121 +2,305 @@
 
 import os
 import asyncio
-import pandas as pd
-from utils import portfolio, secrets
-from fetch_data import fetch_data_for_asset, fetch_news_for_asset
+import datetime
+from utils import secrets, get_setting
+from assets import list_assets, get_asset_source, get_provider_id
+from fetch_data import (
+    fetch_data_for_asset, fetch_news_for_asset, fetch_stock_data_bulk, fetch_crypto_data_bulk, fetch_news_bulk,
+    get_stock_assets, get_crypto_assets,
+)
 from fetch_reddit import fetch_reddit_data_for_asset
-from process_data import process_data_for_asset
-from ai_analysis import generate_summary_for_asset, send_telegram_message
-from datetime import datetime
+from process_data import process_data_for_asset, process_data_for_assets
+from ai_analysis import (
+    generate_summary_for_asset, generate_summaries_batch, summary_batch_mode_enabled, is_fallback_summary,
+    SUMMARY_MODEL,
+)
+from notifications import send_telegram_message
+from http_client import close_http_clients
+from summary_store import save_daily_summary
+from metrics import stage, record, start_run, write_run_report
+from checkpoints import CheckpointStore, fingerprint_asset_data, fingerprint_file, hash_inputs
+from snapshots import update_feed_snapshot
+from storage import get_news_path, get_reddit_path
+from scheduler import Stage, StageGraph
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
-async def run_pipeline_for_asset(asset):
-    print(f"Starting pipeline for {asset}...")
+# Per-asset stages in dependency order (see build_asset_graph)
+FETCH_STAGES = ('fetch_prices', 'fetch_news', 'fetch_reddit')
+REPORT_STAGES = ('summarize', 'notify', 'store')
+ASSET_STAGES = FETCH_STAGES + ('process', 'snapshot') + REPORT_STAGES
 
-    # Determine source (portfolio or watchlist)
-    portfolio_data = portfolio.get('portfolio', {})
-    watchlist_data = portfolio.get('watchlist', {})
-
-    if (asset in portfolio_data.get('stocks', []) or
-        asset in portfolio_data.get('etfs', []) or
-        asset in portfolio_data.get('crypto', [])):
-        source = "portfolio"
-    elif (asset in watchlist_data.get('stocks', []) or
-          asset in watchlist_data.get('crypto', [])):
-        source = "watchlist"
-    else:
-        source = "watchlist"
+# Days of history behind each summary, and items fetched per news/Reddit request
+SUMMARY_LOOKBACK_DAYS = 30
+FEED_LIMIT = 20
 
-    # 1. Fetch Data
-    try:
-        fetch_data_for_asset(asset)
-    except Exception as e:
-        print(f"Failed to fetch data for {asset}: {e}")
-        return
+def build_asset_graph(prefetched=frozenset(), process_pool=None, news_prefetched=frozenset()):
+    """
+    Build the per-asset stage graph for today's run:
 
-    try:
-        fetch_news_for_asset(asset, limit=20)
-    except Exception as e:
-        print(f"Failed to fetch news for {asset}: {e}")
+        fetch_prices -> process -> snapshot -> summarize -> notify, store
+        fetch_news, fetch_reddit -----^
 
-    try:
-        await fetch_reddit_data_for_asset(asset, limit=20)  # Properly await the coroutine
-    except Exception as e:
-        print(f"Failed to fetch Reddit data for {asset}: {e}")
+    News and Reddit fetches run alongside the price fetch, and notify and
+    store run together. Fetch checkpoints are keyed by date, so a rerun on
+    the same day reuses them; later stages are skipped while the data they
+    depend on is unchanged. Processing writes the market part of each
+    asset's snapshot record and the snapshot stage adds the top news and
+    Reddit posts; summaries are built from that record alone. Assets in `prefetched` (filled by the bulk
+    download stage) only fingerprint their stored bars, and assets in
+    `news_prefetched` (filled by the batched news fetch) their news file.
+    """
+    today = datetime.date.today().isoformat()
 
-    # 2. Process Data
-    try:
-        process_data_for_asset(asset)
-    except Exception as e:
-        print(f"Failed to process data for {asset}: {e}")
-        return
+    async def fetch_prices(asset, inputs):
+        # HTTP calls go through the shared async client; blocking calls (yfinance,
+        # storage) run in worker threads so other pipelines keep making progress.
+        # A failed fetch raises, so the stage is not checkpointed and a rerun fetches again
+        if asset not in prefetched and not await fetch_data_for_asset(asset):
+            raise RuntimeError("the price request failed")
+        fingerprint = await asyncio.to_thread(fingerprint_asset_data, asset)
+        if fingerprint is None:
+            raise ValueError("no price data is stored")
+        return fingerprint
 
-    # 3. Generate daily summary
-    summary = generate_summary_for_asset(asset, source=source, lookback_days=30)
-    print(f"Summary for {asset}:\n{summary}\n")
+    async def fetch_news(asset, inputs):
+        if asset not in news_prefetched and not await fetch_news_for_asset(asset, limit=FEED_LIMIT):
+            raise RuntimeError("the NewsAPI request failed")
+        return await asyncio.to_thread(fingerprint_file, get_news_path(asset))
 
-    # 4. Send to Telegram (optional)
-    bot_token = secrets.get('telegram_bot_token')
-    chat_id = secrets.get('telegram_chat_id')
+    async def fetch_reddit(asset, inputs):
+        if not await fetch_reddit_data_for_asset(asset, limit=FEED_LIMIT):
+            raise RuntimeError("the Reddit request failed")
+        return await asyncio.to_thread(fingerprint_file, get_reddit_path(asset))
 
-    if not bot_token or not chat_id:
-        print("Telegram bot token or chat ID is not set. Skipping Telegram message.")
-    else:
-        send_telegram_message(summary, bot_token, chat_id)
-
-    # 5. Store daily summary for weekly aggregation
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    data_dir = os.path.join(base_dir, 'data')
-    daily_summary_file = os.path.join(data_dir, "daily_summaries.csv")
-
-    today_str = datetime.now().strftime("%Y-%m-%d")
-    row = {
-        "date": today_str,
-        "asset": asset,
-        "source": source,
-        "summary": summary
-    }
-
-    if not os.path.exists(daily_summary_file):
-        try:
-            df = pd.DataFrame([row])
-            df.to_csv(daily_summary_file, index=False)
-            print(f"Created daily summaries file for {asset}.")
-        except Exception as e:
-            print(f"Failed to create daily summaries file for {asset}: {e}")
+    async def process(asset, inputs):
+        # With a process pool, indicators are computed on another core; workers
+        # receive only the asset name and load its data from storage themselves.
+        if process_pool is not None:
+            rows = await asyncio.get_running_loop().run_in_executor(process_pool, process_data_for_asset, asset)
+        else:
+            rows = await asyncio.to_thread(process_data_for_asset, asset)
+        record('process', asset, rows=rows or 0)
+
+    async def snapshot(asset, inputs):
+        snapshot_record = await asyncio.to_thread(update_feed_snapshot, asset)
+        return hash_inputs(snapshot_record)
+
+    async def summarize(asset, inputs):
+        # Summaries of concurrent pipelines are requested from OpenAI concurrently
+        summary = await generate_summary_for_asset(asset, source=get_asset_source(asset),
+                                                   lookback_days=SUMMARY_LOOKBACK_DAYS)
+        print(f"Summary for {asset}:\n{summary}\n")
+        return summary
+
+    async def notify(asset, inputs):
+        bot_token = secrets.get('telegram_bot_token')
+        chat_id = secrets.get('telegram_chat_id')
+        if not bot_token or not chat_id:
+            print("Telegram bot token or chat ID is not set. Skipping Telegram message.")
+            return
+        if not await send_telegram_message(inputs['summarize'], bot_token, chat_id):
+            raise RuntimeError("Telegram did not accept the message")
+
+    async def store(asset, inputs):
+        # Each (date, asset) row is upserted in SQLite, so concurrent pipelines
+        # can write safely and reruns replace rather than duplicate summaries.
+        await asyncio.to_thread(save_daily_summary, asset, get_asset_source(asset), inputs['summarize'])
+        print(f"Stored daily summary for {asset}.")
+
+    return StageGraph([
+        Stage('fetch_prices', fetch_prices, action="fetch data",
+              params=lambda asset: [today, get_provider_id(asset)]),
+        Stage('fetch_news', fetch_news, action="fetch news", params=lambda asset: [today, FEED_LIMIT]),
+        Stage('fetch_reddit', fetch_reddit, action="fetch Reddit data", params=lambda asset: [today, FEED_LIMIT]),
+        Stage('process', process, requires=('fetch_prices',), action="process data",
+              params=lambda asset: get_setting('indicators')),
+        # Error and template summaries are not checkpointed, so a retry asks the LLM again
+        Stage('snapshot', snapshot, requires=('process',), after=('fetch_news', 'fetch_reddit'),
+              action="build snapshot"),
+        Stage('summarize', summarize, requires=('snapshot',),
+              action="generate summary", keep=lambda summary: not is_fallback_summary(summary),
+              params=lambda asset: [get_asset_source(asset), SUMMARY_LOOKBACK_DAYS, SUMMARY_MODEL]),
+        Stage('notify', notify, requires=('summarize',), action="send Telegram message",
+              params=lambda asset: [today, secrets.get('telegram_chat_id')]),
+        Stage('store', store, requires=('summarize',), action="store daily summary",
+              params=lambda asset: [today, get_asset_source(asset)]),
+    ])
+
+async def run_pipeline_for_asset(asset, graph, checkpoints, outputs=None):
+    """
+    Run every stage of an asset's pipeline, resuming from its checkpoints.
+    """
+    print(f"Starting pipeline for {asset}...")
+    outputs = {} if outputs is None else outputs
+    await graph.run(asset, ASSET_STAGES, outputs, checkpoints)
+    if 'store' in outputs:
+        print(f"Pipeline completed for {asset}.\n")
+
+async def daily_workflow():
+    # Portfolio assets first, then the watchlist (asset registry order)
+    all_assets = list_assets()
+
+    # Fan assets out concurrently, bounded by max_concurrent_assets
+    max_concurrent = max(1, int(get_setting('max_concurrent_assets', 1)))
+    semaphore = asyncio.Semaphore(max_concurrent)
+    # Size the thread pool used by asyncio.to_thread to match the concurrency limit
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max_concurrent))
+
+    # Start indicator worker processes before any threads exist (safe to fork)
+    process_pool = await start_process_pool()
+
+    # Checkpoints of earlier attempts (data/checkpoints.db) let a rerun skip finished stages
+    checkpoints = await asyncio.to_thread(CheckpointStore.load)
+    prefetched = set()
+    news_prefetched = set()
+    graph = build_asset_graph(prefetched, process_pool, news_prefetched)
+    outputs = {asset: {} for asset in all_assets}
+    fetched = {asset for asset in all_assets if graph.resume(asset, 'fetch_prices', outputs[asset], checkpoints)}
+    if fetched:
+        print(f"Prices for {len(fetched)} assets were already fetched today; resuming from checkpoints.")
+    news_fetched = {asset for asset in all_assets if graph.resume(asset, 'fetch_news', outputs[asset], checkpoints)}
+
+    # Bulk-download every stock/ETF, snapshot every coin and batch the news
+    # queries up front; anything not saved here falls back to a per-asset fetch
+    async def timed(name, awaitable):
+        with stage(name):
+            return await awaitable
+
+    stock_result, crypto_result, news_result = await asyncio.gather(
+        timed('bulk_yfinance', asyncio.to_thread(fetch_stock_data_bulk,
+                                                 [a for a in get_stock_assets() if a not in fetched])),
+        timed('bulk_coingecko', fetch_crypto_data_bulk([a for a in get_crypto_assets() if a not in fetched])),
+        timed('bulk_newsapi', fetch_news_bulk([a for a in all_assets if a not in news_fetched], limit=FEED_LIMIT)),
+        return_exceptions=True,
+    )
+    for label, result in (("stock/ETF download", stock_result), ("crypto market snapshot", crypto_result)):
+        if isinstance(result, Exception):
+            print(f"Bulk {label} failed: {result}")
+        else:
+            prefetched |= result
+    if isinstance(news_result, Exception):
+        print(f"Batched news fetch failed: {news_result}")
     else:
+        news_prefetched |= news_result
+
+    async def run_bounded(func, asset, *args):
+        async with semaphore:
+            try:
+                return await func(asset, *args)
+            except Exception as e:
+                print(f"Error processing {asset}: {e}")
+
+    panel_mode = get_setting('indicator_mode', 'per_asset') == 'panel'
+    batch_summaries = summary_batch_mode_enabled()
+    if not panel_mode and not batch_summaries:
+        print(f"Running pipelines for {len(all_assets)} assets (max {max_concurrent} concurrent)...")
         try:
-            df_existing = pd.read_csv(daily_summary_file)
-            df_new = pd.DataFrame([row])
-            df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-            df_combined.to_csv(daily_summary_file, index=False)
-            print(f"Updated daily summaries file for {asset}.")
-        except Exception as e:
-            print(f"Failed to update daily summaries file for {asset}: {e}")
+            await asyncio.gather(*(run_bounded(run_pipeline_for_asset, asset, graph, checkpoints, outputs[asset])
+                                   for asset in all_assets))
+        finally:
+            if process_pool is not None:
+                process_pool.shutdown()
+        return
 
-    print(f"Pipeline completed for {asset}.\n")
+    try:
+        if panel_mode:
+            # Panel mode: fetch everything, compute indicators for all assets in one
+            # vectorized panel, then summarize
+            print(f"Fetching inputs for {len(all_assets)} assets (max {max_concurrent} concurrent)...")
+            await asyncio.gather(*(run_bounded(graph.run, asset, FETCH_STAGES, outputs[asset], checkpoints)
+                                   for asset in all_assets))
+            ready = [asset for asset in all_assets if 'fetch_prices' in outputs[asset]]
+            pending = [asset for asset in ready if not graph.resume(asset, 'process', outputs[asset], checkpoints)]
+            processed = {}
+            try:
+                if pending:
+                    with stage('process_panel'):
+                        processed = await process_panel(pending, process_pool)
+            except Exception as e:
+                # Resumed assets still go on; the rest are processed one by one
+                print(f"Failed to process data as a panel: {e}. Processing assets individually.")
+                await asyncio.gather(*(run_bounded(graph.run, asset, ('process',), outputs[asset], checkpoints)
+                                       for asset in pending))
+            for asset, rows in processed.items():
+                record('process', asset, rows=rows)
+                await asyncio.to_thread(graph.complete, asset, 'process', outputs[asset], checkpoints)
+            await asyncio.gather(*(run_bounded(graph.run, asset, ('snapshot',), outputs[asset], checkpoints)
+                                   for asset in ready))
+        else:
+            # Batch summaries need every asset processed before the LLM requests
+            print(f"Preparing {len(all_assets)} assets (max {max_concurrent} concurrent)...")
+            await asyncio.gather(*(run_bounded(graph.run, asset, FETCH_STAGES + ('process', 'snapshot'),
+                                               outputs[asset], checkpoints)
+                                   for asset in all_assets))
+    finally:
+        if process_pool is not None:
+            process_pool.shutdown()
+    ready = [asset for asset in all_assets if 'snapshot' in outputs[asset]]
 
-async def daily_workflow():
-    portfolio_data = portfolio.get('portfolio', {})
-    watchlist_data = portfolio.get('watchlist', {})
+    if batch_summaries:
+        pending = [asset for asset in ready if not graph.resume(asset, 'summarize', outputs[asset], checkpoints)]
+        if pending:
+            with stage('summarize_batch'):
+                summaries = await generate_summaries_batch([(asset, get_asset_source(asset)) for asset in pending],
+                                                           lookback_days=SUMMARY_LOOKBACK_DAYS)
+            for asset, summary in summaries.items():
+                print(f"Summary for {asset}:\n{summary}\n")
+                await asyncio.to_thread(graph.complete, asset, 'summarize', outputs[asset], checkpoints, summary)
+    await asyncio.gather(*(run_bounded(graph.run, asset, REPORT_STAGES, outputs[asset], checkpoints)
+                           for asset in ready))
+
+def get_indicator_workers():
+    """
+    Number of worker processes for indicator computation (0 = use threads).
+    """
+    return int(get_setting('indicator_workers', 0) or 0)
 
-    portfolio_assets = portfolio_data.get('stocks', []) + \
-                       portfolio_data.get('etfs', []) + \
-                       portfolio_data.get('crypto', [])
-    watchlist_assets = watchlist_data.get('stocks', []) + \
-                       watchlist_data.get('crypto', [])
+async def start_process_pool():
+    """
+    Create the process pool for indicator processing (settings.yaml:
+    indicator_workers), or return None to process in threads.
+    """
+    workers = get_indicator_workers()
+    if workers <= 0:
+        return None
+    process_pool = ProcessPoolExecutor(max_workers=workers)
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(process_pool, os.getpid) for _ in range(workers)))
+    print(f"Started {workers} indicator worker processes.")
+    return process_pool
 
-    all_assets = portfolio_assets + watchlist_assets
+async def process_panel(assets, process_pool=None):
+    """
+    Run panel processing for the assets, split into one panel per worker
+    process when a pool is available. Returns {asset: rows processed}.
+    """
+    if process_pool is None or len(assets) <= 1:
+        return await asyncio.to_thread(process_data_for_assets, assets)
 
-    for asset in all_assets:
+    workers = get_indicator_workers()
+    chunks = [assets[i::workers] for i in range(workers) if assets[i::workers]]
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(loop.run_in_executor(process_pool, process_data_for_assets, chunk)
+                                     for chunk in chunks))
+    return {asset: rows for chunk in results for asset, rows in chunk.items()}
+
+async def main():
+    start_run('daily_run')
+    try:
+        await daily_workflow()
+    finally:
+        # Per-asset, per-stage report (data/metrics) and a one-line summary
         try:
-            await run_pipeline_for_asset(asset)
+            write_run_report()
         except Exception as e:
-            print(f"Error processing {asset}: {e}")
+            print(f"Failed to write run metrics: {e}")
+        # Close pooled connections once every pipeline is done
+        await close_http_clients()
 
 if __name__ == "__main__":
     try:
-        asyncio.run(daily_workflow())
+        asyncio.run(main())
         print("Daily workflow complete!")
     except Exception as e:
         print(f"Daily workflow failed: {e}")
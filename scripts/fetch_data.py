@@ -1,28 +1,51 @@
 import os
+import re
+import asyncio
 import datetime
-import requests
 import pandas as pd
-import yfinance as yf
-from utils import portfolio, settings, secrets, is_crypto
+from utils import secrets, get_setting
+from assets import is_crypto, list_assets, get_provider_id, get_asset
+from storage import read_asset_data, write_asset_data, read_last_timestamp, get_news_path
+from news_store import claim_new_articles, read_last_published, prune_seen
+from rate_limit import request_with_retry
+import metrics
 
-def fetch_data_for_asset(asset):
+# Maximum number of coin ids CoinGecko returns per /coins/markets page
+COINGECKO_MARKETS_PAGE_SIZE = 250
+# NewsAPI limits: characters in a query, and articles per request
+NEWSAPI_MAX_QUERY_CHARS = 500
+NEWSAPI_MAX_PAGE_SIZE = 100
+# Articles kept per asset in data/news_<asset>_data.csv, newest first
+NEWS_MAX_STORED = 100
+NEWS_COLUMNS = ['title', 'description', 'url', 'publishedAt']
+
+async def fetch_data_for_asset(asset):
     """
     Fetch market data for a given asset (stock or cryptocurrency).
-    """
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_dir = os.path.join(base_dir, 'data')
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
+    CoinGecko is queried through the shared async HTTP client; yfinance and
+    storage I/O run in worker threads.
 
+    In incremental mode (settings.yaml: incremental_fetch) only the bars after
+    the last stored timestamp are requested and merged into the existing file.
+
+    Returns True when the stored data is current (new bars saved, or none
+    due), False when the fetch failed or returned nothing for a new asset.
+    """
     end_date = datetime.date.today()
     start_date = end_date - datetime.timedelta(days=365)
+    last_timestamp = await asyncio.to_thread(get_last_timestamp, asset) if incremental_fetch_enabled() else None
 
     if is_crypto(asset):
         print(f"Fetching crypto data for {asset}...")
         # Fetch price, volume, and market cap data from CoinGecko
-        url = f"https://api.coingecko.com/api/v3/coins/{asset}/market_chart"
-        params = {'vs_currency': 'usd', 'days': '365'}
-        response = requests.get(url, params=params)
+        days = 365
+        if last_timestamp is not None:
+            # Re-request the last stored day so its partial "now" point gets replaced
+            days = max(1, (datetime.datetime.utcnow() - last_timestamp).days + 1)
+            print(f"Incremental fetch for {asset}: last stored {last_timestamp}, requesting {days} day(s).")
+        url = f"https://api.coingecko.com/api/v3/coins/{get_provider_id(asset)}/market_chart"
+        params = {'vs_currency': 'usd', 'days': str(days), 'interval': 'daily'}
+        response = await request_with_retry('coingecko', 'GET', url, params=params)
         if response.status_code == 200:
             data = response.json()
             if data:
@@ -36,102 +59,540 @@ def fetch_data_for_asset(asset):
                     'price': [p[1] for p in prices],
                     'volume': [v[1] for v in volumes],
                     'market_cap': [mc[1] for mc in market_caps]
-                })
+                }).set_index('datetime')
 
-                file_path = os.path.join(data_dir, f"{asset}_data.csv")
-                df.to_csv(file_path, index=False)
+                file_path = await asyncio.to_thread(save_price_data, asset, df)
                 print(f"Saved crypto data for {asset} to {file_path}")
-            else:
-                print(f"No crypto data returned for {asset}")
+                return True
+            print(f"No crypto data returned for {asset}")
         else:
             print(f"Error fetching crypto data for {asset}: {response.status_code}")
+        return False
     else:
+        if last_timestamp is not None:
+            start_date = last_timestamp.date() + datetime.timedelta(days=1)
+            if start_date >= end_date:
+                print(f"Stock/ETF data for {asset} is up to date (last stored {last_timestamp.date()}).")
+                return True
+            print(f"Incremental fetch for {asset} from {start_date}...")
         print(f"Fetching stock/ETF data for {asset}...")
-        # Fetch stock/ETF data from Yahoo Finance
-        df = yf.download(asset, start=start_date.isoformat(), end=end_date.isoformat())
+        # Fetch stock/ETF data from Yahoo Finance (imported here: yfinance is slow to import)
+        import yfinance as yf
+        ticker = get_provider_id(asset)
+        df = await asyncio.to_thread(yf.download, ticker, start=start_date.isoformat(), end=end_date.isoformat())
 
         if not df.empty:
             # Fix column names for multi-index columns
             if isinstance(df.columns, pd.MultiIndex):
-                df.columns = df.columns.droplevel(1)
+                df = _select_ticker_columns(df, ticker)
+
+            await asyncio.to_thread(save_stock_data, asset, df)
+            return True
+        if last_timestamp is not None:
+            print(f"No new bars for {asset} since {last_timestamp.date()}.")
+            return True
+        print(f"No data returned for {asset}. Check if ticker is correct.")
+        return False
+
+def incremental_fetch_enabled():
+    """
+    Whether fetches should only request bars newer than the stored history.
+    """
+    return bool(get_setting('incremental_fetch', True))
+
+def get_last_timestamp(asset):
+    """
+    Return the latest stored timestamp for an asset, or None if there is no
+    usable history. Only the date index is read from storage.
+    """
+    try:
+        return read_last_timestamp(asset)
+    except Exception as e:
+        print(f"Could not read stored history for {asset}: {e}")
+        return None
+
+def merge_price_history(df_existing, df_new):
+    """
+    Merge newly fetched bars into the stored history (both indexed by date).
+
+    Stored rows at or after the first new timestamp are replaced by the new
+    bars, so partial bars are corrected and duplicates dropped. Columns that
+    only exist in the stored history (e.g. indicators) are kept for the old
+    rows and recomputed by process_data.
+    """
+    # process_data renames CoinGecko's 'price' to 'Close' in the stored data
+    if 'price' in df_new.columns and 'Close' in df_existing.columns and 'price' not in df_existing.columns:
+        df_new = df_new.rename(columns={'price': 'Close'})
+
+    df_existing = df_existing[df_existing.index < df_new.index.min()]
+    merged = pd.concat([df_existing, df_new])
+    merged = merged[~merged.index.duplicated(keep='last')]
+    return merged.sort_index()
+
+def save_price_data(asset, df):
+    """
+    Store fetched bars for an asset, merging them into the existing history
+    when incremental fetching is enabled. Returns the path written.
+    """
+    metrics.add(rows=len(df))
+    if incremental_fetch_enabled():
+        try:
+            df_existing = read_asset_data(asset)
+            if df_existing is not None and not df_existing.empty:
+                df = merge_price_history(df_existing, df)
+        except Exception as e:
+            print(f"Failed to merge with stored history for {asset}, overwriting: {e}")
+    return write_asset_data(asset, df)
+
+def _select_ticker_columns(df, ticker):
+    """
+    Extract the single-level OHLCV columns for one ticker from a MultiIndex
+    yfinance frame, whichever level the ticker symbols are on.
+    """
+    for level in range(df.columns.nlevels):
+        if ticker in df.columns.get_level_values(level):
+            return df.xs(ticker, axis=1, level=level)
+    return df.droplevel(1, axis=1)
+
+def save_stock_data(asset, df):
+    """
+    Store a single ticker's yfinance frame (indexed by date) for an asset.
+    """
+    df = df.dropna(how='all')
+    df.index.name = 'Date'
+    file_path = save_price_data(asset, df)
+    print(f"Saved stock/ETF data for {asset} to {file_path}")
+    print("Columns:", df.columns.tolist())
+
+def get_stock_assets():
+    """
+    List every stock and ETF in portfolio.yaml (portfolio and watchlist).
+    """
+    return list_assets(provider='yfinance')
+
+def fetch_stock_data_bulk(assets=None):
+    """
+    Fetch stock/ETF data for many tickers with multi-ticker yf.download calls
+    and split the result into per-asset CSV files.
+
+    Tickers are requested in batches of `yfinance_batch_size` (settings.yaml).
+    Returns the set of assets that were saved; anything missing from it should
+    be fetched individually with fetch_data_for_asset.
+    """
+    if assets is None:
+        assets = get_stock_assets()
+    assets = list(dict.fromkeys(assets))
+    if not assets:
+        return set()
+
+    end_date = datetime.date.today()
+    default_start = end_date - datetime.timedelta(days=365)
+    batch_size = max(1, int(get_setting('yfinance_batch_size', 100)))
+
+    # Group tickers by the first missing day so each group shares one request window
+    saved = set()
+    has_history = set()
+    groups = {}
+    for asset in assets:
+        start_date = default_start
+        if incremental_fetch_enabled():
+            last_timestamp = get_last_timestamp(asset)
+            if last_timestamp is not None:
+                has_history.add(asset)
+                start_date = last_timestamp.date() + datetime.timedelta(days=1)
+                if start_date >= end_date:
+                    print(f"Stock/ETF data for {asset} is up to date (last stored {last_timestamp.date()}).")
+                    saved.add(asset)
+                    continue
+        groups.setdefault(start_date, []).append(asset)
+
+    if groups:
+        # Imported only when there is something to download (slow to import)
+        import yfinance as yf
+
+    for start_date, group in sorted(groups.items()):
+        for i in range(0, len(group), batch_size):
+            batch = group[i:i + batch_size]
+            print(f"Fetching stock/ETF data for {len(batch)} tickers from {start_date} in one request...")
+            try:
+                df = yf.download([get_provider_id(a) for a in batch],
+                                 start=start_date.isoformat(), end=end_date.isoformat(),
+                                 group_by='ticker')
+            except Exception as e:
+                print(f"Bulk download failed for {batch}: {e}")
+                continue
+
+            if df.empty:
+                print(f"No data returned for batch {batch}.")
+                # Stored histories stay valid when there are no new bars (e.g. weekends)
+                saved.update(a for a in batch if a in has_history)
+                continue
+
+            for asset in batch:
+                ticker = get_provider_id(asset)
+                if isinstance(df.columns, pd.MultiIndex):
+                    if ticker not in df.columns.get_level_values(0):
+                        if asset in has_history:
+                            saved.add(asset)
+                        else:
+                            print(f"No data returned for {asset}. Check if ticker is correct.")
+                        continue
+                    df_asset = df[ticker]
+                else:
+                    # A batch of one comes back with flat columns
+                    df_asset = df
+
+                if df_asset.dropna(how='all').empty:
+                    if asset in has_history:
+                        print(f"No new bars for {asset} since the last stored date.")
+                        saved.add(asset)
+                    else:
+                        print(f"No data returned for {asset}. Check if ticker is correct.")
+                    continue
+
+                save_stock_data(asset, df_asset)
+                saved.add(asset)
+
+    return saved
+
+def crypto_snapshot_enabled():
+    """
+    Whether crypto prices are refreshed from one bulk /coins/markets snapshot
+    (settings.yaml: crypto_fetch_mode) instead of a market_chart call per coin.
+    Snapshots extend stored history, so they also need incremental fetching.
+    """
+    return get_setting('crypto_fetch_mode', 'per_asset') == 'snapshot' and incremental_fetch_enabled()
+
+def get_crypto_assets():
+    """
+    List every cryptocurrency in portfolio.yaml (portfolio and watchlist).
+    """
+    return list_assets('crypto')
+
+def merge_market_snapshot(df_existing, df_snapshot):
+    """
+    Append a current-price snapshot to the stored daily history.
+
+    Stored rows after midnight of the snapshot's day (an earlier snapshot,
+    or the partial "now" point ending CoinGecko's daily series) are
+    replaced, so each day keeps at most one intraday point: the latest
+    snapshot. A midnight bar only exists for days covered by a full
+    market_chart fetch; days refreshed by snapshots alone are stored as
+    their last snapshot time, not normalized to midnight.
+    """
+    day_start = df_snapshot.index.min().normalize()
+    df_existing = df_existing[df_existing.index <= day_start]
+    return merge_price_history(df_existing, df_snapshot)
+
+def save_market_snapshot(asset, df):
+    """
+    Merge a one-row snapshot into an asset's stored history. Returns the path written.
+    """
+    metrics.add(rows=len(df))
+    df_existing = read_asset_data(asset)
+    return write_asset_data(asset, merge_market_snapshot(df_existing, df))
+
+async def fetch_crypto_data_bulk(assets=None):
+    """
+    Refresh current price, volume and market cap for many coins with one
+    CoinGecko /coins/markets request (up to 250 ids per page).
 
-            df.reset_index(inplace=True)
-            file_path = os.path.join(data_dir, f"{asset}_data.csv")
-            df.to_csv(file_path, index=False)
-            print(f"Saved stock/ETF data for {asset} to {file_path}")
+    Only coins whose stored history reaches yesterday or later are updated
+    this way. Returns the set of assets that were saved; coins with no local
+    history or a gap of missing days are left out and should be fetched with
+    fetch_data_for_asset (full or gap-filling market_chart request).
+    """
+    if assets is None:
+        assets = get_crypto_assets()
+    assets = list(dict.fromkeys(assets))
+    if not assets or not crypto_snapshot_enabled():
+        return set()
 
-            # Quick sanity check
-            print("CSV Header:", pd.read_csv(file_path, nrows=0).columns.tolist())
+    today = datetime.datetime.utcnow().date()
+    stored = await asyncio.to_thread(lambda: {asset: get_last_timestamp(asset) for asset in assets})
+    last_timestamps = {}
+    for asset, last_timestamp in stored.items():
+        if last_timestamp is None:
+            print(f"No stored history for {asset}; it will be fetched in full.")
+        elif last_timestamp.date() < today - datetime.timedelta(days=1):
+            print(f"Stored history for {asset} ends {last_timestamp.date()}; it will be gap-filled.")
         else:
-            print(f"No data returned for {asset}. Check if ticker is correct.")
+            last_timestamps[asset] = last_timestamp
+
+    saved = set()
+    # CoinGecko answers by coin id, which may differ from the portfolio symbol
+    symbols_by_id = {get_provider_id(asset): asset for asset in last_timestamps}
+    ids = list(symbols_by_id)
+    url = "https://api.coingecko.com/api/v3/coins/markets"
+    for i in range(0, len(ids), COINGECKO_MARKETS_PAGE_SIZE):
+        batch = ids[i:i + COINGECKO_MARKETS_PAGE_SIZE]
+        print(f"Fetching market snapshot for {len(batch)} coins in one request...")
+        params = {
+            'vs_currency': 'usd',
+            'ids': ','.join(batch),
+            'per_page': COINGECKO_MARKETS_PAGE_SIZE,
+            'page': 1,
+        }
+        response = await request_with_retry('coingecko', 'GET', url, params=params)
+        if response.status_code != 200:
+            print(f"Error fetching crypto market snapshot: {response.status_code}")
+            continue
+
+        for coin in response.json() or []:
+            asset = symbols_by_id.get(coin.get('id'))
+            if asset is None or coin.get('current_price') is None:
+                continue
+            timestamp = pd.to_datetime(coin.get('last_updated'), utc=True, errors='coerce')
+            timestamp = pd.Timestamp.utcnow() if pd.isna(timestamp) else timestamp
+            timestamp = timestamp.tz_localize(None)
+            if timestamp <= last_timestamps[asset]:
+                print(f"Crypto data for {asset} is up to date (last stored {last_timestamps[asset]}).")
+                saved.add(asset)
+                continue
+
+            df = pd.DataFrame({
+                'price': [coin['current_price']],
+                'volume': [coin.get('total_volume')],
+                'market_cap': [coin.get('market_cap')],
+            }, index=pd.DatetimeIndex([timestamp], name='datetime'))
+            try:
+                file_path = await asyncio.to_thread(save_market_snapshot, asset, df)
+            except Exception as e:
+                print(f"Failed to save market snapshot for {asset}: {e}")
+                continue
+            print(f"Saved crypto snapshot for {asset} to {file_path}")
+            saved.add(asset)
 
-def fetch_news_for_asset(asset, limit=20):
+    missing = set(last_timestamps) - saved
+    if missing:
+        print(f"No market snapshot for {sorted(missing)}; falling back to per-asset fetches.")
+    return saved
+
+def news_batch_enabled():
     """
-    Fetch recent news headlines related to the asset using NewsAPI.
+    Whether news is fetched with OR-combined NewsAPI queries covering several
+    assets (settings.yaml: news_fetch_mode) instead of one query per asset.
+    """
+    return get_setting('news_fetch_mode', 'per_asset') == 'batch'
+
+def news_query_kind(asset):
+    """
+    Keyword added to an asset's news query.
+    """
+    return 'crypto' if is_crypto(asset) else 'stock'
+
+def news_terms(asset):
+    """
+    Names an asset is searched and recognized by in news: its symbol and,
+    when different, its provider ID (e.g. btc and bitcoin).
+    """
+    entry = get_asset(asset)
+    return list(dict.fromkeys([asset, entry.provider_id] if entry is not None else [asset]))
+
+def build_news_query(assets):
+    """
+    NewsAPI query for assets of one kind: "<asset> <kind>" for a single
+    asset known by one name, otherwise every name quoted and OR-combined,
+    e.g. ("AAPL" OR "MSFT") AND stock.
+    """
+    kind = news_query_kind(assets[0])
+    terms = [term for asset in assets for term in news_terms(asset)]
+    if len(terms) == 1:
+        return f"{terms[0]} {kind}"
+    return "(" + " OR ".join(f'"{term}"' for term in terms) + f") AND {kind}"
+
+def batch_news_queries(assets, batch_size):
+    """
+    Split assets into batches of one kind, at most `batch_size` each, whose
+    OR-combined query fits NewsAPI's query length limit.
+    """
+    groups = {}
+    for asset in assets:
+        groups.setdefault(news_query_kind(asset), []).append(asset)
+    batches = []
+    for group in groups.values():
+        batch = []
+        for asset in group:
+            if batch and (len(batch) >= batch_size
+                          or len(build_news_query(batch + [asset])) > NEWSAPI_MAX_QUERY_CHARS):
+                batches.append(batch)
+                batch = []
+            batch.append(asset)
+        if batch:
+            batches.append(batch)
+    return batches
+
+def route_article(article, assets):
+    """
+    Return the assets of a batched query that an article mentions: any of
+    their news_terms as a whole word, in any case, in its title,
+    description or content (NewsAPI matches queries case-insensitively too).
+    """
+    text = ' '.join(str(article.get(field) or '') for field in ('title', 'description', 'content'))
+    return [asset for asset in assets
+            if any(re.search(rf"(?<!\w){re.escape(term)}(?!\w)", text, re.IGNORECASE)
+                   for term in news_terms(asset))]
+
+def get_last_published(assets):
+    """
+    Return {asset: latest stored publishedAt} for incremental news fetches,
+    or {} when incremental fetching is off or the seen-set is unreadable.
+    """
+    if not incremental_fetch_enabled():
+        return {}
+    try:
+        return read_last_published(assets)
+    except Exception as e:
+        print(f"Could not read stored news state: {e}")
+        return {}
+
+def merge_news(df_existing, df_new):
+    """
+    Merge new articles into the stored ones: one row per URL, newest first,
+    at most NEWS_MAX_STORED rows.
+    """
+    merged = pd.concat([df_new, df_existing], ignore_index=True)
+    merged = merged.drop_duplicates(subset='url', keep='first')
+    merged = merged.sort_values('publishedAt', ascending=False, kind='stable')
+    return merged.head(NEWS_MAX_STORED)
+
+def save_news_data(asset, articles):
+    """
+    Add an asset's articles that are not in its seen-set to
+    data/news_<asset>_data.csv. Returns the number of new articles.
+    The articles are only marked as seen once the file has been written.
+    """
+    file_path = get_news_path(asset)
+
+    def write(new_articles):
+        df = pd.DataFrame(new_articles).reindex(columns=NEWS_COLUMNS)
+        if os.path.exists(file_path):
+            df = merge_news(pd.read_csv(file_path).reindex(columns=NEWS_COLUMNS), df)
+        df.to_csv(file_path, index=False)
+
+    articles = claim_new_articles(asset, articles, store=write)
+    if not articles:
+        print(f"No new articles for {asset}.")
+        return 0
+    metrics.add(rows=len(articles))
+    print(f"{len(articles)} new articles for {asset} saved to {file_path}")
+    return len(articles)
+
+async def fetch_news_batch(assets, limit=20, last_published=None):
+    """
+    Fetch news for assets of one kind with a single NewsAPI query and store
+    up to `limit` new articles per asset. Articles of a batched query go to
+    the assets they mention. With `last_published` ({asset: publishedAt})
+    only newer articles are requested and kept.
+
+    Returns the assets whose news is complete, or None if the request
+    failed. When a batched query fills its page, the busiest assets may
+    have crowded out the others, so assets that got no article are left
+    out to be queried again.
     """
     api_key = secrets.get('newsapi_key')
-    if not api_key:
-        print("No NewsAPI key found. Skipping news fetch for asset.")
-        return
 
-    query = f"{asset} {'crypto' if is_crypto(asset) else 'stock'}"
+    last_published = last_published or {}
+    query = build_news_query(assets)
     url = "https://newsapi.org/v2/everything"
+    page_size = min(NEWSAPI_MAX_PAGE_SIZE, limit * len(assets))
     params = {
         'q': query,
         'sortBy': 'publishedAt',
         'apiKey': api_key,
         'language': 'en',
-        'pageSize': limit
+        'pageSize': page_size
     }
+    if all(asset in last_published for asset in assets):
+        # The oldest cutoff of the batch; newer cutoffs are applied per asset below
+        oldest = min(last_published[asset] for asset in assets)
+        params['from'] = pd.Timestamp(oldest).strftime('%Y-%m-%dT%H:%M:%S')
 
-    print(f"Fetching news for {asset} with query: {query}")
-    response = requests.get(url, params=params)
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_dir = os.path.join(base_dir, 'data')
-    if response.status_code == 200:
-        data = response.json()
-        articles = data.get('articles', [])
-        if articles:
-            df = pd.DataFrame(articles)
-            columns_to_keep = ['title', 'description', 'url', 'publishedAt']
-            df = df[columns_to_keep]
-            file_path = os.path.join(data_dir, f"news_{asset}_data.csv")
-            df.to_csv(file_path, index=False)
-            print(f"News data fetched for {asset} and saved to {file_path}")
-        else:
-            print(f"No articles found for {asset}.")
-    else:
-        print(f"NewsAPI error for {asset}: {response.status_code}")
+    print(f"Fetching news for {', '.join(assets)} with query: {query}")
+    response = await request_with_retry('newsapi', 'GET', url, params=params)
+    if response.status_code != 200:
+        print(f"NewsAPI error for {', '.join(assets)}: {response.status_code}")
+        return None
+
+    articles = response.json().get('articles') or []
+    if not articles:
+        print(f"No articles found for {', '.join(assets)}.")
+    mentioned = set()
+    routed = {asset: [] for asset in assets}
+    for article in articles:
+        for asset in (assets if len(assets) == 1 else route_article(article, assets)):
+            mentioned.add(asset)
+            if (article.get('publishedAt') or '') >= last_published.get(asset, ''):
+                routed[asset].append(article)
 
-def process_data_for_asset(asset):
+    complete = set(assets)
+    if len(assets) > 1 and len(articles) >= page_size:
+        complete = mentioned
+    for asset in complete:
+        await asyncio.to_thread(save_news_data, asset, routed[asset][:limit])
+    return complete
+
+async def fetch_news_for_asset(asset, limit=20):
     """
-    Perform basic analysis on the fetched data, e.g., calculating SMA, RSI, etc.
+    Fetch recent news headlines related to the asset using NewsAPI.
+
+    Only articles newer than the last stored one are requested (with
+    incremental_fetch), and articles already in the asset's seen-set
+    (data/news_seen.db) are skipped; new ones are merged into its news file.
+
+    Returns False when the NewsAPI request failed; without an API key the
+    fetch is skipped and counts as done.
     """
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_dir = os.path.join(base_dir, 'data')
-    file_path = os.path.join(data_dir, f"{asset}_data.csv")
+    if not secrets.get('newsapi_key'):
+        print("No NewsAPI key found. Skipping news fetch for asset.")
+        return True
+    last_published = await asyncio.to_thread(get_last_published, [asset])
+    return await fetch_news_batch([asset], limit, last_published) is not None
 
-    if not os.path.exists(file_path):
-        print(f"Data file for {asset} does not exist. Skipping processing.")
-        return
+async def fetch_news_bulk(assets=None, limit=20):
+    """
+    Fetch news for many assets with OR-combined NewsAPI queries of up to
+    `news_batch_size` assets (settings.yaml), stretching the daily request
+    quota across a larger universe. Each asset keeps up to `limit` new
+    articles that mention it. Assets crowded out of a full page are queried
+    again in smaller batches, down to one query each.
 
-    df = pd.read_csv(file_path, parse_dates=['datetime'] if is_crypto(asset) else ['Date'])
-    if is_crypto(asset):
-        df.set_index('datetime', inplace=True)
-    else:
-        df.set_index('Date', inplace=True)
-
-    # Add moving averages
-    df['SMA_20'] = df['price'].rolling(window=20).mean() if is_crypto(asset) else df['Close'].rolling(window=20).mean()
-    df['EMA_20'] = df['price'].ewm(span=20, adjust=False).mean() if is_crypto(asset) else df['Close'].ewm(span=20, adjust=False).mean()
-
-    # Add RSI (14-period)
-    delta = df['price'].diff() if is_crypto(asset) else df['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    df['RSI_14'] = 100 - (100 / (1 + rs))
-
-    # Save processed data
-    df.to_csv(file_path)
-    print(f"Processed data for {asset} and saved to {file_path}.")
+    Returns the set of assets whose news was fetched; anything missing from
+    it (its query failed) should be fetched with fetch_news_for_asset.
+    """
+    if assets is None:
+        assets = list_assets()
+    assets = list(dict.fromkeys(assets))
+    if not assets or not news_batch_enabled():
+        return set()
+    if not secrets.get('newsapi_key'):
+        print("No NewsAPI key found. Skipping news fetch.")
+        return set(assets)
+
+    await asyncio.to_thread(prune_seen)
+    last_published = await asyncio.to_thread(get_last_published, assets)
+    # Assets with similar cutoffs share a query, so each batch's 'from' excludes more old articles
+    assets.sort(key=lambda asset: last_published.get(asset, ''))
+    batch_size = max(1, int(get_setting('news_batch_size', 20)))
+    batches = batch_news_queries(assets, batch_size)
+    print(f"Fetching news for {len(assets)} assets in {len(batches)} requests...")
+
+    saved = set()
+    while batches:
+        results = await asyncio.gather(*(fetch_news_batch(batch, limit, last_published) for batch in batches),
+                                       return_exceptions=True)
+        crowded_out = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                print(f"Batched news fetch failed for {batch}: {result}")
+            elif result is not None:
+                saved |= result
+                missing = [asset for asset in batch if asset not in result]
+                if missing:
+                    crowded_out.append((missing, len(batch)))
+        batches = []
+        for missing, size in crowded_out:
+            # Shrink the batch so each query covers fewer assets (at least half as many)
+            print(f"News page full; querying {len(missing)} crowded-out assets again.")
+            batches += batch_news_queries(missing, min(len(missing), size // 2) or 1)
+    return saved
@@ -1,15 +1,34 @@
-import os
 import asyncio
-import asyncpraw
-import pandas as pd
 from utils import secrets
+from assets import list_assets
+from http_client import get_reddit_client, close_http_clients
 import logging
-from asyncprawcore.exceptions import Redirect, Forbidden, NotFound
+from rate_limit import call_with_retry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+async def _fetch_hot_posts(reddit, asset, limit):
+    """
+    Fetch the hot posts of r/<asset> as a list of dicts.
+    """
+    # Await the subreddit coroutine to get the actual Subreddit object
+    subreddit = await reddit.subreddit(asset)
+
+    posts = []
+    logger.info(f"Fetching top {limit} hot posts from r/{asset}...")
+    async for submission in subreddit.hot(limit=limit):
+        posts.append({
+            "title": submission.title,
+            "score": submission.score,
+            "num_comments": submission.num_comments,
+            "created_utc": submission.created_utc,
+            "url": submission.url,
+            "subreddit": submission.subreddit.display_name,
+        })
+    return posts
+
 async def fetch_reddit_data_for_asset(asset, limit=20):
     """
     Fetches the top Reddit posts for a given asset and saves them to a CSV file.
@@ -17,6 +36,9 @@ async def fetch_reddit_data_for_asset(asset, limit=20):
     Parameters:
     - asset (str): The asset symbol or name (e.g., 'AAPL', 'bitcoin').
     - limit (int): The number of top posts to fetch.
+
+    Returns False if the fetch failed and is worth retrying; True otherwise
+    (posts saved, none found, subreddit missing or no credentials).
     """
     reddit_client_id = secrets.get('reddit_client_id')
     reddit_client_secret = secrets.get('reddit_client_secret')
@@ -26,37 +48,31 @@ async def fetch_reddit_data_for_asset(asset, limit=20):
 
     if not reddit_client_id or not reddit_client_secret or not reddit_user_agent:
         logger.error("Reddit API credentials are not set. Skipping Reddit data fetch.")
-        return
+        return True
 
-    try:
-        reddit = asyncpraw.Reddit(
-            client_id=reddit_client_id,
-            client_secret=reddit_client_secret,
-            user_agent=reddit_user_agent
-        )
+    # Imported here so importing this module stays cheap (asyncprawcore pulls in aiohttp)
+    from asyncprawcore.exceptions import (
+        Redirect, Forbidden, NotFound, TooManyRequests, ServerError, RequestException
+    )
 
-        # Await the subreddit coroutine to get the actual Subreddit object
-        subreddit = await reddit.subreddit(asset)
+    try:
+        # One shared client for all assets, closed by close_http_clients()
+        reddit = get_reddit_client(reddit_client_id, reddit_client_secret, reddit_user_agent)
 
-        posts = []
-        logger.info(f"Fetching top {limit} hot posts from r/{asset}...")
-        async for submission in subreddit.hot(limit=limit):
-            posts.append({
-                "title": submission.title,
-                "score": submission.score,
-                "num_comments": submission.num_comments,
-                "created_utc": submission.created_utc,
-                "url": submission.url,
-                "subreddit": submission.subreddit.display_name,
-            })
+        # Paced by the Reddit token bucket and retried on rate limits/server errors
+        posts = await call_with_retry(
+            'reddit', _fetch_hot_posts, reddit, asset, limit,
+            retry_on=(TooManyRequests, ServerError, RequestException),
+            get_retry_after=lambda e: getattr(e, 'retry_after', None),
+        )
 
         if not posts:
             logger.warning(f"No posts found for subreddit: r/{asset}")
         else:
             # Save to CSV
-            data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
-            os.makedirs(data_dir, exist_ok=True)
-            reddit_file = os.path.join(data_dir, f"reddit_{asset}_data.csv")
+            import pandas as pd
+            from storage import get_reddit_path
+            reddit_file = get_reddit_path(asset)
             df_posts = pd.DataFrame(posts)
             df_posts.to_csv(reddit_file, index=False)
             logger.info(f"Saved Reddit data for {asset} to {reddit_file}")
@@ -68,31 +84,22 @@ async def fetch_reddit_data_for_asset(asset, limit=20):
         logger.error(f"Subreddit r/{asset} not found.")
     except Exception as e:
         logger.exception(f"Failed to fetch Reddit data for {asset}: {e}")
-    finally:
-        await reddit.close()
-        logger.info("Reddit client closed.")
+        return False
+    return True
 
 async def fetch_all_reddit_data(limit=20):
     """
     Fetches Reddit data for all assets in portfolio.yaml.
     """
-    from utils import portfolio  # Import dynamically to avoid circular imports
-
-    portfolio_data = portfolio.get('portfolio', {})
-    watchlist_data = portfolio.get('watchlist', {})
-
-    # Combine portfolio and watchlist assets
-    portfolio_assets = portfolio_data.get('stocks', []) + \
-                       portfolio_data.get('etfs', []) + \
-                       portfolio_data.get('crypto', [])
-    watchlist_assets = watchlist_data.get('stocks', []) + \
-                       watchlist_data.get('crypto', [])
-
-    all_assets = portfolio_assets + watchlist_assets
+    all_assets = list_assets()
     logger.info(f"Assets to process for Reddit data: {all_assets}")
 
     tasks = [fetch_reddit_data_for_asset(asset, limit) for asset in all_assets]
-    await asyncio.gather(*tasks)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        await close_http_clients()
+        logger.info("Reddit client closed.")
 
 if __name__ == "__main__":
     try:
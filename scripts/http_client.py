@@ -0,0 +1,75 @@
+# http_client.py
+
+import logging
+import httpx
+from utils import get_setting
+
+# httpx logs every request URL at INFO, which would leak API keys and the
+# Telegram bot token into the job logs
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+_client = None
+_reddit = None
+
+def _http2_available():
+    """
+    HTTP/2 needs the optional h2 package (httpx[http2]).
+    """
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def get_http_client():
+    """
+    Return the shared httpx.AsyncClient used for CoinGecko, NewsAPI and
+    Telegram, creating it on first use.
+
+    The client keeps connections alive between requests (and negotiates
+    HTTP/2 where available), so repeated calls to the same host skip new
+    TCP/TLS handshakes. Must be used from the event loop it was created on.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        max_connections = int(get_setting('http_max_connections', 100))
+        _client = httpx.AsyncClient(
+            http2=_http2_available(),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=60,
+            ),
+            timeout=httpx.Timeout(30.0, connect=10.0),
+        )
+    return _client
+
+def get_reddit_client(client_id, client_secret, user_agent):
+    """
+    Return the shared asyncpraw.Reddit client, creating it on first use.
+
+    asyncpraw runs on its own aiohttp session, so Reddit shares one pooled
+    client (and one OAuth token) across all assets instead of going
+    through httpx.
+    """
+    global _reddit
+    if _reddit is None:
+        import asyncpraw
+        _reddit = asyncpraw.Reddit(
+            client_id=client_id,
+            client_secret=client_secret,
+            user_agent=user_agent
+        )
+    return _reddit
+
+async def close_http_clients():
+    """
+    Close the shared HTTP and Reddit clients. Call once at the end of a run.
+    """
+    global _client, _reddit
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if _reddit is not None:
+        await _reddit.close()
+        _reddit = None
@@ -1,3 +1,4 @@
+import os
 import pandas as pd
 import numpy as np
 
@@ -35,12 +36,403 @@ def compute_bollinger_bands(df, column='Close', window=20, num_std=2):
     df['Bollinger_Lower'] = rolling_mean - (rolling_std * num_std)
     return df
 
+def _true_range(df, high_col, low_col, close_col):
+    """
+    True range as a NumPy array: the largest of high-low, |high-prev_close|
+    and |low-prev_close|. The first bar has no previous close, so its true
+    range is high-low.
+    """
+    return _true_range_values(
+        df[high_col].to_numpy(dtype=np.float64),
+        df[low_col].to_numpy(dtype=np.float64),
+        df[close_col].to_numpy(dtype=np.float64),
+    )
+
+def _true_range_values(high, low, close):
+    """
+    True range of NumPy arrays, row-wise along the first axis (1-D or 2-D).
+    """
+    prev_close = np.empty_like(close)
+    prev_close[:1] = np.nan
+    prev_close[1:] = close[:-1]
+    # fmax ignores the NaN gaps left by the missing previous close
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
 def compute_atr(df, high_col='High', low_col='Low', close_col='Close', period=14):
-    df['Prev_Close'] = df[close_col].shift(1)
-    df['TR'] = df.apply(
-        lambda row: max(row[high_col] - row[low_col],
-                        abs(row[high_col] - row['Prev_Close']),
-                        abs(row[low_col] - row['Prev_Close'])), axis=1)
-    df[f'ATR_{period}'] = df['TR'].ewm(span=period, adjust=False).mean()
-    df.drop(['Prev_Close', 'TR'], axis=1, inplace=True)
+    tr = _true_range(df, high_col, low_col, close_col)
+    df[f'ATR_{period}'] = pd.Series(tr, index=df.index).ewm(span=period, adjust=False).mean()
+    return df
+
+def compute_atr_wilder(df, high_col='High', low_col='Low', close_col='Close', period=14):
+    """
+    ATR with Wilder's smoothing: seeded with the simple mean of the first
+    `period` true ranges, then ATR_t = ATR_{t-1} + (TR_t - ATR_{t-1}) / period.
+    """
+    tr = _true_range(df, high_col, low_col, close_col)
+    df[f'ATR_Wilder_{period}'] = _wilder_smooth(tr, period)
     return df
+
+def _wilder_smooth(values, period):
+    """
+    Wilder smoothing of a NumPy array, NaN until `period` values are available.
+    """
+    smoothed = np.full(len(values), np.nan)
+    if len(values) >= period:
+        seeded = values[period - 1:].copy()
+        seeded[0] = values[:period].mean()
+        smoothed[period - 1:] = pd.Series(seeded).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+    return smoothed
+
+# Default parameters for each indicator the engine understands
+INDICATOR_DEFAULTS = {
+    'sma': (20,),
+    'ema': (20,),
+    'rsi': (14,),
+    'macd': (12, 26, 9),
+    'bollinger': (20, 2),
+    'atr': (14,),
+    'atr_wilder': (14,),
+}
+
+# Indicators computed when settings.yaml does not list any
+DEFAULT_INDICATOR_SPECS = [
+    ('sma', 20),
+    ('ema', 20),
+    ('rsi', 14),
+    ('macd', 12, 26, 9),
+    ('bollinger', 20, 2),
+    ('atr', 14),
+]
+
+def parse_indicator_specs(specs):
+    """
+    Normalize a declarative spec list such as [("sma", 20), ["macd", 12, 26, 9], "rsi"]
+    into (name, *params) tuples, filling omitted parameters with defaults.
+    Unknown indicators are reported and skipped.
+    """
+    parsed = []
+    for spec in specs:
+        if isinstance(spec, str):
+            spec = (spec,)
+        name, params = str(spec[0]).lower(), tuple(spec[1:])
+        if name not in INDICATOR_DEFAULTS:
+            print(f"Unknown indicator '{name}' in spec {spec}, skipping.")
+            continue
+        defaults = INDICATOR_DEFAULTS[name]
+        parsed.append((name,) + params + defaults[len(params):])
+    return parsed
+
+def compute_indicators(df, specs=None, column='Close', high_col='High', low_col='Low', return_state=False):
+    """
+    Compute every indicator in `specs` and return them as one new DataFrame
+    aligned to df's index, without modifying df.
+
+    `column` is copied once into a contiguous float64 array and intermediates
+    shared between indicators (rolling means, EMAs, price deltas, true range)
+    are computed only once. Column names match the compute_* functions.
+    ATR specs are skipped when the high/low columns are missing.
+
+    With return_state=True, also returns the state needed to extend the
+    indicators with update_indicators when new bars are appended.
+    """
+    specs = parse_indicator_specs(DEFAULT_INDICATOR_SPECS if specs is None else specs)
+    close, high, low = _input_arrays(df, column, high_col, low_col)
+    out, seeds = _compute_indicator_arrays(close, high, low, specs)
+    block = pd.DataFrame(out, index=df.index)
+    if not return_state:
+        return block
+    return block, _build_indicator_state(df, specs, column, high_col, low_col, seeds,
+                                         rows=len(df), columns=list(block.columns))
+
+def update_indicators(df_new, state):
+    """
+    Extend indicators over bars appended after the ones `state` was built from.
+
+    Recursive indicators (EMA, MACD, ATR) continue from their last values and
+    rolling ones (SMA, RSI, Bollinger) use the buffered tail of recent bars,
+    so the cost is O(len(df_new)) regardless of history length. Results match
+    a full recomputation as long as the last bar of each update has a value.
+    Returns (block for df_new's rows, updated state).
+    """
+    specs = [tuple(spec) for spec in state['specs']]
+    column, high_col, low_col = state['column'], state['high_col'], state['low_col']
+
+    tail = pd.DataFrame(state['tail'])
+    frame = pd.concat([tail, df_new[list(tail.columns)].reset_index(drop=True)], ignore_index=True)
+    start = len(tail)
+
+    close, high, low = _input_arrays(frame, column, high_col, low_col)
+    out, seeds = _compute_indicator_arrays(close, high, low, specs, seeds=state['seeds'], start=start)
+    block = pd.DataFrame({name: values[start:] for name, values in out.items()}, index=df_new.index)
+    new_state = _build_indicator_state(frame, specs, column, high_col, low_col, seeds,
+                                       rows=state['rows'] + len(df_new), columns=list(block.columns))
+    return block, new_state
+
+def compute_panel_indicators(frames, specs=None, column='Close', high_col='High', low_col='Low',
+                             return_state=False, memmap_dir=None):
+    """
+    Compute indicators for many assets at once over a 2-D (bar x asset) panel.
+
+    `frames` maps each asset to its DataFrame. All series are stacked into one
+    float64 matrix aligned on each asset's most recent bar, so assets on
+    different calendars (stocks vs. 24/7 crypto) share the matrix without
+    interior gaps; shorter histories are padded with leading NaNs that the
+    engine ignores. Every indicator is then one vectorized call over all
+    columns, and results are identical to compute_indicators per asset.
+
+    With `memmap_dir`, the input panels are memory-mapped .npy files in that
+    directory instead of in-memory arrays, so the OS can page out history
+    that is not being worked on.
+
+    Returns a dict mapping each asset to its indicator block (aligned to its
+    own index), or to (block, state) when return_state is True.
+    """
+    specs = parse_indicator_specs(DEFAULT_INDICATOR_SPECS if specs is None else specs)
+    assets = [asset for asset, df in frames.items() if len(df) > 0]
+    if not assets:
+        return {}
+
+    rows = max(len(frames[asset]) for asset in assets)
+    offsets = np.array([rows - len(frames[asset]) for asset in assets])
+    has_range = [high_col in frames[asset].columns and low_col in frames[asset].columns for asset in assets]
+
+    def panel(col, include):
+        if memmap_dir is not None:
+            values = np.lib.format.open_memmap(os.path.join(memmap_dir, f"{col}.npy"), mode='w+',
+                                               dtype=np.float64, shape=(rows, len(assets)))
+            values[:] = np.nan
+        else:
+            values = np.full((rows, len(assets)), np.nan)
+        for j, asset in enumerate(assets):
+            if include[j]:
+                values[offsets[j]:, j] = frames[asset][col].to_numpy(dtype=np.float64)
+        return values
+
+    close = panel(column, [True] * len(assets))
+    high = low = None
+    if any(has_range):
+        high, low = panel(high_col, has_range), panel(low_col, has_range)
+
+    out, seeds = _compute_indicator_arrays(close, high, low, specs, offsets=offsets)
+
+    results = {}
+    for j, asset in enumerate(assets):
+        df = frames[asset]
+        block = pd.DataFrame({
+            name: values[offsets[j]:, j] for name, values in out.items()
+            if has_range[j] or not name.startswith('ATR_')
+        }, index=df.index)
+        if return_state:
+            asset_seeds = {key: (None if values is None else values[j]) for key, values in seeds.items()
+                           if has_range[j] or not key.startswith('atr')}
+            state = _build_indicator_state(df, specs, column, high_col, low_col, asset_seeds,
+                                           rows=len(df), columns=list(block.columns))
+            results[asset] = (block, state)
+        else:
+            results[asset] = block
+    return results
+
+def _input_arrays(df, column, high_col, low_col):
+    """
+    Copy the close (and high/low, if present) columns into contiguous float64 arrays.
+    """
+    close = np.ascontiguousarray(df[column].to_numpy(dtype=np.float64))
+    if high_col in df.columns and low_col in df.columns:
+        return close, df[high_col].to_numpy(dtype=np.float64), df[low_col].to_numpy(dtype=np.float64)
+    return close, None, None
+
+def _tail_length(specs):
+    """
+    Number of trailing bars the rolling indicators in `specs` need to be
+    extended exactly (at least two, so ATR has a previous close).
+    """
+    length = 2
+    for name, *params in specs:
+        if name in ('sma', 'bollinger'):
+            length = max(length, params[0])
+        elif name in ('rsi', 'atr_wilder'):
+            length = max(length, params[0] + 1)
+    return length
+
+def _build_indicator_state(df, specs, column, high_col, low_col, seeds, rows, columns):
+    """
+    Collect the recursive seeds and the tail of input bars into a JSON-serializable state.
+    """
+    input_columns = [c for c in (column, high_col, low_col) if c in df.columns]
+    tail = df[input_columns].iloc[-_tail_length(specs):]
+    return {
+        'specs': [list(spec) for spec in specs],
+        'column': column,
+        'high_col': high_col,
+        'low_col': low_col,
+        'columns': columns,
+        'rows': rows,
+        'seeds': seeds,
+        'tail': {c: [None if np.isnan(v) else float(v) for v in tail[c].to_numpy(dtype=np.float64)]
+                 for c in input_columns},
+    }
+
+def _pandas(values):
+    """
+    Wrap a 1-D array in a Series or a 2-D array in a DataFrame for rolling/ewm.
+    """
+    return pd.Series(values) if values.ndim == 1 else pd.DataFrame(values)
+
+def _ewm_from(values, start, seed, **ewm_kwargs):
+    """
+    adjust=False EWM of values[start:], continuing from `seed` (the EWM value
+    at start - 1) when one is given. Positions before `start` are NaN.
+    Seeds are only used for 1-D values.
+    """
+    result = np.full(values.shape, np.nan)
+    if seed is None or np.isnan(seed):
+        result[start:] = _pandas(values[start:]).ewm(adjust=False, **ewm_kwargs).mean().to_numpy()
+    else:
+        seeded = np.concatenate(([seed], values[start:]))
+        result[start:] = pd.Series(seeded).ewm(adjust=False, **ewm_kwargs).mean().to_numpy()[1:]
+    return result
+
+def _last_value(values):
+    """
+    Last row of an array as a float (1-D) or a list of floats (2-D), with
+    NaN reported as None.
+    """
+    if len(values) == 0:
+        return None if values.ndim == 1 else [None] * values.shape[1]
+    last = values[-1]
+    if values.ndim == 1:
+        return None if np.isnan(last) else float(last)
+    return [None if np.isnan(v) else float(v) for v in last]
+
+def _compute_indicator_arrays(close, high, low, specs, seeds=None, start=0, offsets=None):
+    """
+    Compute the indicators for parsed `specs` as a dict of NumPy arrays.
+
+    Inputs are 1-D (one asset) or 2-D (bars x assets, see
+    compute_panel_indicators, where `offsets` gives the first row of each
+    column). Recursive indicators are evaluated from row `start` onward,
+    continuing from `seeds` (keyed like 'ema:20'); rolling indicators use the
+    whole array. Returns (arrays, final seeds).
+    """
+    seeds = seeds or {}
+    close_frame = _pandas(close)
+    has_range = high is not None and low is not None
+    cache = {}
+    final_seeds = {}
+
+    def shared(key, func):
+        if key not in cache:
+            cache[key] = func()
+        return cache[key]
+
+    def recursive(key, func):
+        # Cache a recursive series and remember its last value as the next seed
+        values = shared(key, func)
+        final_seeds[key] = _last_value(values)
+        return values
+
+    def rolling_mean(window, min_periods):
+        # One min_periods=1 mean per window, masked by the count of valid values
+        mean = shared(('rolling_mean', window),
+                      lambda: close_frame.rolling(window=window, min_periods=1).mean().to_numpy())
+        if min_periods <= 1:
+            return mean
+        count = shared(('rolling_count', window), lambda: _rolling_count(close, window))
+        return np.where(count >= min_periods, mean, np.nan)
+
+    def ema(span):
+        key = f'ema:{span}'
+        return recursive(key, lambda: _ewm_from(close, start, seeds.get(key), span=span))
+
+    def gains_losses():
+        # Price deltas split into gains and losses. The first bar of each
+        # series counts as a zero change; panel padding before it is ignored.
+        def split():
+            delta = np.diff(close, axis=0, prepend=np.full((1,) + close.shape[1:], np.nan))
+            gain = np.where(delta > 0, delta, 0.0)
+            loss = np.where(delta < 0, -delta, 0.0)
+            if offsets is not None:
+                padding = np.arange(len(close))[:, None] < offsets[None, :]
+                gain[padding] = np.nan
+                loss[padding] = np.nan
+            return gain, loss
+        return shared('gains_losses', split)
+
+    def true_range():
+        return shared('true_range', lambda: _true_range_values(high, low, close))
+
+    out = {}
+    for name, *params in specs:
+        if name == 'sma':
+            window, = params
+            out[f'SMA_{window}'] = rolling_mean(window, window)
+        elif name == 'ema':
+            window, = params
+            out[f'EMA_{window}'] = ema(window)
+        elif name == 'rsi':
+            period, = params
+            gain, loss = gains_losses()
+            avg_gain = _pandas(gain).rolling(window=period, min_periods=1).mean().to_numpy()
+            avg_loss = _pandas(loss).rolling(window=period, min_periods=1).mean().to_numpy()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                out[f'RSI_{period}'] = 100 - (100 / (1.0 + avg_gain / avg_loss))
+        elif name == 'macd':
+            fast, slow, signal = params
+            macd_line = ema(fast) - ema(slow)
+            key = f'macd_signal:{fast}:{slow}:{signal}'
+            macd_signal = recursive(key, lambda: _ewm_from(macd_line, start, seeds.get(key), span=signal))
+            out['MACD_line'] = macd_line
+            out['MACD_signal'] = macd_signal
+            out['MACD_histogram'] = macd_line - macd_signal
+        elif name == 'bollinger':
+            window, num_std = params
+            middle = rolling_mean(window, 1)
+            std = shared(('rolling_std', window),
+                         lambda: close_frame.rolling(window=window, min_periods=1).std().to_numpy())
+            out['Bollinger_Middle'] = middle
+            out['Bollinger_Upper'] = middle + std * num_std
+            out['Bollinger_Lower'] = middle - std * num_std
+        elif name == 'atr':
+            if not has_range:
+                continue
+            period, = params
+            key = f'atr:{period}'
+            out[f'ATR_{period}'] = recursive(
+                key, lambda: _ewm_from(true_range(), start, seeds.get(key), span=period))
+        elif name == 'atr_wilder':
+            if not has_range:
+                continue
+            period, = params
+            key = f'atr_wilder:{period}'
+            seed = seeds.get(key)
+            if seed is None:
+                # Not seeded yet: the arrays still hold the whole (short) history
+                out[f'ATR_Wilder_{period}'] = recursive(
+                    key, lambda: _wilder_smooth_columns(true_range(), period, offsets))
+            else:
+                out[f'ATR_Wilder_{period}'] = recursive(
+                    key, lambda: _ewm_from(true_range(), start, seed, alpha=1.0 / period))
+
+    return out, final_seeds
+
+def _wilder_smooth_columns(values, period, offsets=None):
+    """
+    Wilder smoothing of a 1-D array, or of each column of a 2-D panel starting
+    at its offset row.
+    """
+    if values.ndim == 1:
+        return _wilder_smooth(values, period)
+    smoothed = np.full(values.shape, np.nan)
+    for j in range(values.shape[1]):
+        first = 0 if offsets is None else offsets[j]
+        smoothed[first:, j] = _wilder_smooth(values[first:, j], period)
+    return smoothed
+
+def _rolling_count(values, window):
+    """
+    Number of non-NaN values in each trailing window of `window` rows.
+    """
+    valid = np.cumsum(~np.isnan(values), axis=0)
+    valid = np.concatenate((np.zeros((1,) + values.shape[1:], dtype=valid.dtype), valid))
+    end = np.arange(1, len(values) + 1)
+    return valid[end] - valid[np.maximum(end - window, 0)]
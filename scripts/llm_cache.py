@@ -0,0 +1,133 @@
+# llm_cache.py
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from utils import get_setting
+from storage import get_data_dir
+
+# Eviction trims the cache to this fraction of llm_cache_max_mb, so the
+# directory is not rescanned on every write once it is near the limit
+EVICT_TO_FRACTION = 0.9
+
+_lock = threading.Lock()
+# Running estimate of the cache size in bytes; None until the first write scans the directory
+_cache_bytes = None
+
+def get_cache_dir():
+    """
+    Return the directory holding cached LLM responses, creating it if needed.
+    """
+    cache_dir = os.path.join(get_data_dir(), 'llm_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+def get_cache_ttl():
+    """
+    Seconds a cached response stays valid (settings.yaml: llm_cache_ttl_hours, 0 = no caching).
+    """
+    return float(get_setting('llm_cache_ttl_hours', 24) or 0) * 3600
+
+def get_cache_max_bytes():
+    """
+    Size limit of the cache directory (settings.yaml: llm_cache_max_mb).
+    """
+    return float(get_setting('llm_cache_max_mb', 50) or 0) * 1024 * 1024
+
+def make_cache_key(model, messages, **params):
+    """
+    Hash the model, messages and sampling parameters of a chat request.
+    Identical requests map to the same key, so inputs that have not changed
+    since the last run reuse its response.
+    """
+    payload = json.dumps({'model': model, 'messages': messages, 'params': params},
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _cache_path(key):
+    return os.path.join(get_cache_dir(), f"{key}.json")
+
+def read_cached_response(key):
+    """
+    Return the cached response text for a key, or None if it is missing or expired.
+    """
+    ttl = get_cache_ttl()
+    if ttl <= 0:
+        return None
+    path = _cache_path(key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable LLM cache entry {key[:12]}: {e}")
+        return None
+    if time.time() - entry.get('created', 0) > ttl:
+        return None
+    return entry.get('response')
+
+def write_cached_response(key, response, model=None):
+    """
+    Store a response under a key. The directory is scanned (and expired
+    and the oldest entries evicted) on the first write of a run and then
+    only when the running size estimate passes llm_cache_max_mb.
+    """
+    global _cache_bytes
+    if get_cache_ttl() <= 0:
+        return
+    path = _cache_path(key)
+    entry = {'created': time.time(), 'model': model, 'response': response}
+    # Unique temp file per writer; summaries are generated from several threads
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(entry, f, ensure_ascii=False)
+    size = os.path.getsize(tmp_path)
+    os.replace(tmp_path, path)
+    with _lock:
+        if _cache_bytes is not None:
+            _cache_bytes += size
+        if _cache_bytes is None or _cache_bytes > get_cache_max_bytes():
+            _cache_bytes = evict_cache_entries()
+
+def evict_cache_entries():
+    """
+    Remove expired cache files, then the least recently written ones until
+    the directory is below EVICT_TO_FRACTION of llm_cache_max_mb. Returns
+    the size of the remaining entries in bytes.
+    """
+    cache_dir = get_cache_dir()
+    ttl = get_cache_ttl()
+    now = time.time()
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if now - stat.st_mtime > ttl:
+            _remove(path)
+        else:
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    max_bytes = get_cache_max_bytes()
+    if total > max_bytes:
+        for _, size, path in sorted(entries):
+            if total <= max_bytes * EVICT_TO_FRACTION:
+                break
+            _remove(path)
+            total -= size
+    return total
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,194 @@
+# llm_client.py
+
+import asyncio
+import httpx
+from utils import secrets, get_setting
+from http_client import get_http_client
+from rate_limit import TokenBucket, get_bucket, get_provider_config
+from llm_cache import make_cache_key, read_cached_response, write_cached_response
+import metrics
+
+# Rough characters-per-token ratio for English prompts, used to size requests
+# before the API reports the real usage
+CHARS_PER_TOKEN = 4
+# Completion token limit assumed for models missing from llm_max_output_tokens
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+# Seconds allowed to connect to the API, whatever the read timeout
+CONNECT_TIMEOUT = 10.0
+# Longest backoff the OpenAI SDK sleeps between retries
+MAX_RETRY_DELAY = 8.0
+
+_client = None
+_client_http = None
+_semaphore = None
+_token_bucket = None
+_budget = None
+
+class LLMBudgetExceeded(Exception):
+    """
+    Raised when a request would exceed the run's LLM token or cost budget.
+    """
+
+class RunBudget:
+    """
+    Per-run token and cost budget. Requests reserve their worst case (prompt
+    plus max_tokens) up front and settle to the reported usage afterwards,
+    so concurrent requests cannot overshoot the budget together.
+    """
+
+    def __init__(self, max_tokens, max_cost):
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.tokens = 0
+        self.cost = 0.0
+
+    def reserve(self, tokens, cost):
+        if self.max_tokens and self.tokens + tokens > self.max_tokens:
+            return False
+        if self.max_cost and self.cost + cost > self.max_cost:
+            return False
+        self.tokens += tokens
+        self.cost += cost
+        return True
+
+    def settle(self, reserved_tokens, reserved_cost, tokens, cost):
+        self.tokens += tokens - reserved_tokens
+        self.cost += cost - reserved_cost
+
+def get_openai_client():
+    """
+    Return the shared AsyncOpenAI client, creating it on first use. It sends
+    requests through the pooled HTTP client from http_client.py, with
+    llm_timeout as the default per-attempt timeout.
+    """
+    global _client, _client_http
+    http = get_http_client()
+    if _client is None or _client_http is not http:
+        api_key = secrets.get('openai_api_key')
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY is not set in the environment variables.")
+        from openai import AsyncOpenAI
+        _client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=http,
+            timeout=httpx.Timeout(float(get_setting('llm_timeout', 60)), connect=CONNECT_TIMEOUT),
+            max_retries=int(get_provider_config('openai')['max_retries']),
+        )
+        _client_http = http
+    return _client
+
+def get_run_budget():
+    """
+    Return this run's budget (settings.yaml: llm_run_token_budget, llm_run_cost_budget_usd; 0 = unlimited).
+    """
+    global _budget
+    if _budget is None:
+        _budget = RunBudget(
+            max_tokens=int(get_setting('llm_run_token_budget', 0) or 0),
+            max_cost=float(get_setting('llm_run_cost_budget_usd', 0) or 0),
+        )
+    return _budget
+
+def _get_limits():
+    global _semaphore, _token_bucket
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(max(1, int(get_setting('llm_max_concurrent', 4))))
+        tokens_per_minute = float(get_setting('llm_tokens_per_minute', 60000))
+        _token_bucket = TokenBucket(rate=tokens_per_minute / 60.0, capacity=tokens_per_minute)
+    return _semaphore, _token_bucket
+
+def estimate_tokens(messages):
+    """
+    Approximate the prompt tokens of a list of chat messages.
+    """
+    return sum(len(m.get('content') or '') // CHARS_PER_TOKEN + 4 for m in messages)
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """
+    Cost in USD from settings.yaml llm_prices (per 1K prompt/completion tokens).
+    Models without a price count as free.
+    """
+    prices = (get_setting('llm_prices') or {}).get(model) or [0, 0]
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1000.0
+
+def get_max_output_tokens(model):
+    """
+    Completion token limit of a model (settings.yaml: llm_max_output_tokens;
+    4096 for models not listed).
+    """
+    return int((get_setting('llm_max_output_tokens') or {}).get(model) or DEFAULT_MAX_OUTPUT_TOKENS)
+
+def get_llm_timeout(model):
+    """
+    Per-attempt timeout of a model in seconds (settings.yaml: llm_timeouts;
+    llm_timeout for models not listed).
+    """
+    return float((get_setting('llm_timeouts') or {}).get(model) or get_setting('llm_timeout', 60))
+
+async def chat_completion(model, messages, max_tokens, temperature=0.7, timeout=None, **params):
+    """
+    Return the response text of a chat completion.
+
+    Cached responses are returned without touching the API or the budget.
+    Otherwise the request waits for a concurrency slot and for the
+    per-minute request (rate_limits.openai) and token caps. Each attempt
+    times out after `timeout` seconds (default: get_llm_timeout(model)), and
+    the call is cancelled once every SDK retry could have run. Raises LLMBudgetExceeded when the run's
+    token/cost budget cannot cover the request; API errors propagate.
+    Extra params (e.g. response_format) are passed to the API, and
+    max_tokens is clamped to the model's completion limit.
+    """
+    max_tokens = min(max_tokens, get_max_output_tokens(model))
+    key = make_cache_key(model, messages, max_tokens=max_tokens, temperature=temperature, **params)
+    cached = await asyncio.to_thread(read_cached_response, key)
+    if cached is not None:
+        print(f"Using cached {model} response ({key[:12]}).")
+        metrics.add(cache_hits=1)
+        return cached
+
+    prompt_tokens = estimate_tokens(messages)
+    reserved_tokens = prompt_tokens + max_tokens
+    reserved_cost = estimate_cost(model, prompt_tokens, max_tokens)
+    budget = get_run_budget()
+    if not budget.reserve(reserved_tokens, reserved_cost):
+        raise LLMBudgetExceeded(
+            f"LLM budget exhausted ({budget.tokens} tokens, ${budget.cost:.4f} used this run)."
+        )
+
+    timeout = float(timeout or get_llm_timeout(model))
+    retries = int(get_provider_config('openai')['max_retries'])
+    semaphore, token_bucket = _get_limits()
+    used_tokens, used_cost = reserved_tokens, reserved_cost
+    try:
+        async with semaphore:
+            await get_bucket('openai').acquire()
+            await token_bucket.acquire(reserved_tokens)
+            response = await asyncio.wait_for(
+                get_openai_client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+                    **params,
+                ),
+                timeout=(retries + 1) * timeout + retries * MAX_RETRY_DELAY,
+            )
+        usage = response.usage
+        if usage is not None:
+            used_tokens = usage.total_tokens
+            used_cost = estimate_cost(model, usage.prompt_tokens, usage.completion_tokens)
+    except asyncio.TimeoutError:
+        # The server may still bill a request we stopped waiting for; keep it reserved
+        raise
+    except BaseException:
+        # Nothing was generated (or the run was cancelled); release the reservation
+        used_tokens, used_cost = 0, 0.0
+        raise
+    finally:
+        budget.settle(reserved_tokens, reserved_cost, used_tokens, used_cost)
+        metrics.add(tokens=used_tokens, cost_usd=used_cost)
+
+    content = response.choices[0].message.content.strip()
+    await asyncio.to_thread(write_cached_response, key, content, model)
+    return content
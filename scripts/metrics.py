@@ -0,0 +1,168 @@
+# metrics.py
+
+import os
+import json
+import time
+import datetime
+import threading
+import contextvars
+from contextlib import contextmanager
+from utils import get_setting
+
+# Counters recorded per (asset, stage), in report order
+COUNTERS = ('seconds', 'calls', 'errors', 'bytes', 'rows', 'tokens', 'cost_usd', 'retries', 'cache_hits', 'skipped')
+
+# Asset label for stages that cover the whole run (bulk downloads, panels)
+ALL_ASSETS = '*'
+
+_lock = threading.Lock()
+_records = {}
+_run = {'job': None, 'started': None, 'started_at': None}
+# (asset, stage) that add() attributes counters to; copied into tasks and to_thread calls
+_current = contextvars.ContextVar('metrics_stage', default=(ALL_ASSETS, 'other'))
+
+def start_run(job):
+    """
+    Reset the recorded metrics and start timing a run of `job`.
+    """
+    with _lock:
+        _records.clear()
+        _run.update(job=job, started=time.perf_counter(),
+                    started_at=datetime.datetime.now(datetime.timezone.utc))
+
+def _add(key, counters):
+    with _lock:
+        entry = _records.setdefault(key, dict.fromkeys(COUNTERS, 0))
+        for name, value in counters.items():
+            entry[name] += value
+
+def add(**counters):
+    """
+    Add counters (bytes, rows, tokens, cost_usd, retries, cache_hits) to the
+    stage currently running in this task or thread.
+    """
+    _add(_current.get(), counters)
+
+def record(name, asset=None, **counters):
+    """
+    Add counters to a given stage and asset (ALL_ASSETS when omitted), e.g.
+    for work done in another process.
+    """
+    _add((asset or ALL_ASSETS, name), counters)
+
+@contextmanager
+def stage(name, asset=None):
+    """
+    Time a pipeline stage for an asset (ALL_ASSETS when omitted). Counters
+    added inside the block, including from worker threads started in it,
+    are attributed to this stage; exceptions are counted and re-raised.
+    """
+    key = (asset or ALL_ASSETS, name)
+    token = _current.set(key)
+    start = time.perf_counter()
+    errors = 0
+    try:
+        yield
+    except BaseException:
+        errors = 1
+        raise
+    finally:
+        _current.reset(token)
+        _add(key, {'seconds': time.perf_counter() - start, 'calls': 1, 'errors': errors})
+
+def get_metrics_dir():
+    """
+    Return the directory run reports are written to, creating it if needed.
+    """
+    # Imported here: storage pulls in pandas, and every HTTP helper imports this module
+    from storage import get_data_dir
+    metrics_dir = os.path.join(get_data_dir(), 'metrics')
+    os.makedirs(metrics_dir, exist_ok=True)
+    return metrics_dir
+
+def build_report():
+    """
+    Return the run's metrics as a dict: totals per stage and counters per
+    asset and stage.
+    """
+    with _lock:
+        records = {key: dict(entry) for key, entry in _records.items()}
+    elapsed = time.perf_counter() - _run['started'] if _run['started'] else 0.0
+
+    stages, assets = {}, {}
+    for (asset, name), entry in sorted(records.items()):
+        total = stages.setdefault(name, dict.fromkeys(COUNTERS, 0))
+        for counter, value in entry.items():
+            total[counter] += value
+        assets.setdefault(asset, {})[name] = entry
+    return {
+        'job': _run['job'],
+        'started': _run['started_at'].isoformat() if _run['started_at'] else None,
+        'seconds': elapsed,
+        'stages': stages,
+        'assets': assets,
+    }
+
+def format_prometheus(report):
+    """
+    Render a report in the Prometheus text exposition format (for the
+    node_exporter textfile collector).
+    """
+    job = report['job']
+    lines = [
+        "# HELP pipeline_run_seconds Wall time of the last pipeline run.",
+        "# TYPE pipeline_run_seconds gauge",
+        f'pipeline_run_seconds{{job="{job}"}} {report["seconds"]:.6f}',
+    ]
+    for counter in COUNTERS:
+        metric = f"pipeline_stage_{counter}"
+        lines.append(f"# HELP {metric} {counter.replace('_', ' ').capitalize()} per asset and stage in the last run.")
+        lines.append(f"# TYPE {metric} gauge")
+        for asset, asset_stages in report['assets'].items():
+            for name, entry in asset_stages.items():
+                lines.append(f'{metric}{{job="{job}",asset="{asset}",stage="{name}"}} {entry[counter]:g}')
+    return "\n".join(lines) + "\n"
+
+def summary_line(report):
+    """
+    One-line summary of a run: wall time, time per stage and totals.
+    """
+    stages = report['stages']
+    totals = {counter: sum(s[counter] for s in stages.values()) for counter in COUNTERS}
+    assets = len([a for a in report['assets'] if a != ALL_ASSETS])
+    by_stage = ", ".join(f"{name} {s['seconds']:.1f}s"
+                         for name, s in sorted(stages.items(), key=lambda item: -item[1]['seconds']))
+    return (f"{report['job']} finished in {report['seconds']:.1f}s for {assets} assets "
+            f"({by_stage}); {totals['bytes'] / 1024 ** 2:.1f} MB fetched, {totals['rows']:,.0f} rows, "
+            f"{totals['tokens']:,.0f} tokens (${totals['cost_usd']:.4f}), {totals['retries']:.0f} retries, "
+            f"{totals['skipped']:.0f} stages resumed, {totals['errors']:.0f} errors")
+
+def write_run_report():
+    """
+    Write the run report as JSON (one file per run, the newest
+    metrics_keep_runs kept) and as a Prometheus text file, print the
+    one-line summary and return the report.
+    """
+    report = build_report()
+    metrics_dir = get_metrics_dir()
+    stamp = (_run['started_at'] or datetime.datetime.now(datetime.timezone.utc)).strftime("%Y%m%d-%H%M%S")
+    job = report['job']
+
+    json_path = os.path.join(metrics_dir, f"{job}_{stamp}.json")
+    with open(json_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    prom_path = os.path.join(metrics_dir, f"{job}.prom")
+    with open(f"{prom_path}.tmp", 'w') as f:
+        f.write(format_prometheus(report))
+    os.replace(f"{prom_path}.tmp", prom_path)
+
+    keep = int(get_setting('metrics_keep_runs', 30) or 0)
+    reports = sorted(name for name in os.listdir(metrics_dir)
+                     if name.startswith(f"{job}_") and name.endswith('.json'))
+    for name in reports[:-keep] if keep else []:
+        os.remove(os.path.join(metrics_dir, name))
+
+    print(summary_line(report))
+    print(f"Metrics written to {json_path} and {prom_path}")
+    return report
@@ -0,0 +1,124 @@
+# news_store.py
+
+import os
+import re
+import sqlite3
+import hashlib
+import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from storage import get_data_dir
+
+# Seen-set entries older than this (by publishedAt) are pruned; NewsAPI's free
+# tier does not return articles this old, so they cannot come back
+SEEN_RETENTION_DAYS = 60
+
+def get_news_db_path():
+    """
+    Return the path of the SQLite database holding the news seen-set.
+    """
+    return os.path.join(get_data_dir(), 'news_seen.db')
+
+def _connect():
+    """
+    Open the seen-set database, creating the table on first use. WAL mode
+    and a busy timeout let concurrent news fetches share the file.
+    """
+    conn = sqlite3.connect(get_news_db_path(), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS news_seen (
+            asset TEXT NOT NULL,
+            key TEXT NOT NULL,
+            published_at TEXT,
+            PRIMARY KEY (asset, key)
+        )
+    """)
+    return conn
+
+def normalize_url(url):
+    """
+    Canonical form of an article URL: lower-case scheme and host, no
+    fragment, trailing slash or utm_* tracking parameters.
+    """
+    parts = urlsplit(url.strip())
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith('utm_')])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), query, ''))
+
+def article_keys(article):
+    """
+    Seen-set keys of an article: its normalized URL and a hash of its title
+    and description, so syndicated copies under another URL also match.
+    """
+    keys = []
+    if article.get('url'):
+        keys.append('url:' + normalize_url(article['url']))
+    text = ' '.join(str(article.get(field) or '') for field in ('title', 'description'))
+    text = re.sub(r'\s+', ' ', text).strip().lower()
+    if text:
+        keys.append('content:' + hashlib.sha256(text.encode('utf-8')).hexdigest())
+    return keys
+
+def claim_new_articles(asset, articles, store=None):
+    """
+    Return the articles not seen before for an asset (keeping the first of
+    any duplicates in `articles`) and add them to the seen-set.
+
+    `store(new_articles)` is called before the seen-set is committed; if it
+    raises, nothing is marked as seen, so the articles come back next run.
+    """
+    conn = _connect()
+    try:
+        with conn:
+            new = []
+            for article in articles:
+                keys = article_keys(article)
+                if not keys:
+                    continue
+                placeholders = ','.join('?' * len(keys))
+                seen = conn.execute(
+                    f"SELECT 1 FROM news_seen WHERE asset = ? AND key IN ({placeholders}) LIMIT 1",
+                    (asset, *keys),
+                ).fetchone()
+                if seen:
+                    continue
+                conn.executemany(
+                    "INSERT OR IGNORE INTO news_seen (asset, key, published_at) VALUES (?, ?, ?)",
+                    [(asset, key, article.get('publishedAt')) for key in keys],
+                )
+                new.append(article)
+            if new and store is not None:
+                store(new)
+        return new
+    finally:
+        conn.close()
+
+def read_last_published(assets):
+    """
+    Return {asset: latest publishedAt in the seen-set} for the given assets;
+    assets without stored articles are left out.
+    """
+    assets = list(assets)
+    if not assets:
+        return {}
+    conn = _connect()
+    try:
+        placeholders = ','.join('?' * len(assets))
+        rows = conn.execute(
+            f"SELECT asset, MAX(published_at) FROM news_seen WHERE asset IN ({placeholders}) GROUP BY asset",
+            assets,
+        ).fetchall()
+    finally:
+        conn.close()
+    return {asset: published for asset, published in rows if published}
+
+def prune_seen(retention_days=SEEN_RETENTION_DAYS):
+    """
+    Drop seen-set entries published more than `retention_days` ago.
+    """
+    cutoff = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=retention_days))
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM news_seen WHERE published_at < ?", (cutoff.strftime('%Y-%m-%dT%H:%M:%SZ'),))
+    finally:
+        conn.close()
@@ -0,0 +1,24 @@
+# notifications.py
+
+import httpx
+from rate_limit import request_with_retry
+
+async def send_telegram_message(message, bot_token, chat_id):
+    """
+    Send a message to a Telegram chat using the provided bot token and chat ID.
+    Returns True if Telegram accepted the message, False if sending failed.
+    """
+    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    params = {
+        "chat_id": chat_id,
+        "text": message,
+        "parse_mode": "Markdown"  # Optional: for better formatting
+    }
+    try:
+        response = await request_with_retry('telegram', 'POST', url, params=params)
+        response.raise_for_status()
+        print("Message sent to Telegram.")
+        return True
+    except httpx.HTTPError as e:
+        print(f"Failed to send message to Telegram: {e}")
+        return False
@@ -1,42 +1,42 @@
-import os
+import tempfile
+import numpy as np
 import pandas as pd
-from utils import is_crypto
+from utils import get_setting
+from storage import (
+    read_asset_data, write_asset_data, read_indicator_state, write_indicator_state, get_data_dir
+)
+from snapshots import update_market_snapshot
 from indicators import (
-    compute_sma, compute_ema, compute_rsi,
-    compute_macd, compute_bollinger_bands, compute_atr
+    compute_indicators, compute_panel_indicators, update_indicators,
+    parse_indicator_specs, DEFAULT_INDICATOR_SPECS
 )
 
-def process_data_for_asset(asset):
+def _rows_after_state(df, state, specs):
     """
-    Process historical data for a single asset by computing various indicators.
-    Assumes a CSV file for the asset exists in data/<asset>_data.csv.
-    After processing, the CSV is overwritten with columns for the computed indicators.
+    Return the rows appended since `state` was saved, or None if the state
+    cannot be used to extend df (different specs, or the stored history it
+    was built from has been replaced or lacks the indicator columns).
     """
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_dir = os.path.join(base_dir, 'data')
-    file_path = os.path.join(data_dir, f"{asset}_data.csv")
+    if not state or state.get('specs') != [list(spec) for spec in specs]:
+        return None
+    last_timestamp = pd.Timestamp(state['last_timestamp'])
+    if last_timestamp not in df.index or not all(c in df.columns for c in state['columns']):
+        return None
+    column = state['column']
+    last_close = state['tail'][column][-1]
+    stored_close = df.at[last_timestamp, column]
+    if last_close is None or not np.isclose(stored_close, last_close):
+        return None
+    return df[df.index > last_timestamp]
 
-    if not os.path.exists(file_path):
+def _load_for_processing(asset):
+    """
+    Load an asset's stored data with a 'Close' column, or None if it cannot be processed.
+    """
+    df = read_asset_data(asset)
+    if df is None:
         print(f"No data file found for {asset}, skipping processing.")
-        return
-
-    # Load the asset data
-    df = pd.read_csv(file_path)
-
-    # Handle date/datetime columns for indexing
-    if 'Date' in df.columns:
-        # Stocks/ETFs from yfinance typically have a 'Date' column
-        df['Date'] = pd.to_datetime(df['Date'])
-        df.set_index('Date', inplace=True)
-    elif 'datetime' in df.columns:
-        # Crypto data from CoinGecko often has 'datetime'
-        df['datetime'] = pd.to_datetime(df['datetime'])
-        df.set_index('datetime', inplace=True)
-    else:
-        print(f"No recognized date column in {asset} data. Cannot process.")
-        return
-
-    df.sort_index(inplace=True)
+        return None
 
     # If crypto, rename 'price' column to 'Close'
     if 'price' in df.columns:
@@ -45,19 +45,117 @@ def process_data_for_asset(asset):
     # Ensure that we have a 'Close' column for indicators
     if 'Close' not in df.columns:
         print(f"No 'Close' column found for {asset}, cannot compute indicators.")
-        return
+        return None
+    return df
 
-    # Compute indicators
-    df = compute_sma(df, column='Close', window=20)
-    df = compute_ema(df, column='Close', window=20)
-    df = compute_rsi(df, column='Close', period=14)
-    df = compute_macd(df, column='Close', fast=12, slow=26, signal=9)
-    df = compute_bollinger_bands(df, column='Close', window=20, num_std=2)
+def _get_indicator_specs():
+    """
+    Return the parsed indicator specs from settings.yaml (or the defaults).
+    """
+    return parse_indicator_specs(get_setting('indicators') or DEFAULT_INDICATOR_SPECS)
 
-    # Compute ATR only if High, Low, Close columns exist (usually only for stocks/ETFs)
-    if all(col in df.columns for col in ['High', 'Low', 'Close']):
-        df = compute_atr(df, high_col='High', low_col='Low', close_col='Close', period=14)
+def _update_from_state(asset, df, specs):
+    """
+    Extend an asset's indicators from its persisted state and save them.
+
+    Returns the number of rows updated (0 if already up to date), or None
+    if its indicators need a full computation.
+    """
+    state = read_indicator_state(asset) if get_setting('incremental_indicators', True) else None
+    new_rows = _rows_after_state(df, state, specs)
+    if new_rows is None:
+        return None
+    if new_rows.empty:
+        print(f"Indicators for {asset} are already up to date.")
+        update_market_snapshot(asset, df, state['columns'])
+        return 0
 
-    # Save the processed data back to the CSV
-    df.to_csv(file_path)
+    block, state = update_indicators(new_rows, state)
+    for column in block.columns:
+        df.loc[block.index, column] = block[column]
+    print(f"Updated indicators for {len(new_rows)} new rows of {asset}.")
+    _save_processed(asset, df, None, state)
+    return len(new_rows)
+
+def _save_processed(asset, df, block, state):
+    """
+    Replace the asset's indicator columns with `block` (if given) and store
+    the data together with its indicator state and the market part of its
+    snapshot (the latest values the summaries are built from).
+    """
+    if block is not None:
+        df = pd.concat([df.drop(columns=block.columns, errors='ignore'), block], axis=1)
+    state['last_timestamp'] = df.index[-1].isoformat()
+
+    # Save the processed data and indicator state back to storage
+    write_asset_data(asset, df)
+    write_indicator_state(asset, state)
+    update_market_snapshot(asset, df, state['columns'])
     print(f"Processed and updated data for {asset} with indicators.")
+
+def process_data_for_asset(asset):
+    """
+    Process historical data for a single asset by computing various indicators.
+    Loads the asset's stored data (see storage.py), which has a datetime index.
+    After processing, the stored data is overwritten with columns for the computed indicators.
+    Returns the number of rows whose indicators were computed, or None if
+    the asset could not be processed.
+    """
+    df = _load_for_processing(asset)
+    if df is None:
+        return None
+
+    specs = _get_indicator_specs()
+    rows = _update_from_state(asset, df, specs)
+    if rows is not None:
+        return rows
+
+    # Compute all configured indicators in one pass (settings.yaml: indicators).
+    # ATR specs are skipped by the engine when High/Low are missing (e.g. crypto).
+    block, state = compute_indicators(df, specs, column='Close', return_state=True)
+    _save_processed(asset, df, block, state)
+    return len(df)
+
+def process_data_for_assets(assets):
+    """
+    Panel mode: process many assets together. Assets with usable indicator
+    state are extended incrementally; all others are stacked into one
+    (bar x asset) panel and their indicators computed in vectorized calls
+    over every column at once (see indicators.compute_panel_indicators).
+    Returns a dict mapping each successfully processed asset to the number
+    of rows whose indicators were computed.
+    """
+    specs = _get_indicator_specs()
+    processed = {}
+    pending = {}
+    for asset in assets:
+        try:
+            df = _load_for_processing(asset)
+            if df is None:
+                continue
+            rows = _update_from_state(asset, df, specs)
+            if rows is not None:
+                processed[asset] = rows
+            else:
+                pending[asset] = df
+        except Exception as e:
+            print(f"Failed to process data for {asset}: {e}")
+
+    if pending:
+        print(f"Computing indicators for {len(pending)} assets as one panel...")
+        # Close/High/Low panels are float64 (bar x asset); large ones are memory-mapped
+        panel_mb = 3 * 8 * max(len(df) for df in pending.values()) * len(pending) / 1024 ** 2
+        memmap_threshold = float(get_setting('panel_memmap_mb', 512) or 0)
+        if memmap_threshold and panel_mb > memmap_threshold:
+            with tempfile.TemporaryDirectory(dir=get_data_dir(), prefix='panel_') as memmap_dir:
+                results = compute_panel_indicators(pending, specs, column='Close', return_state=True,
+                                                   memmap_dir=memmap_dir)
+        else:
+            results = compute_panel_indicators(pending, specs, column='Close', return_state=True)
+        for asset, (block, state) in results.items():
+            try:
+                _save_processed(asset, pending[asset], block, state)
+                processed[asset] = len(block)
+            except Exception as e:
+                print(f"Failed to save processed data for {asset}: {e}")
+    return processed
@@ -0,0 +1,173 @@
+# rate_limit.py
+
+import time
+import random
+import asyncio
+import datetime
+from email.utils import parsedate_to_datetime
+import httpx
+from utils import get_setting
+from http_client import get_http_client
+import metrics
+
+# Used for any provider or field missing from settings.yaml (rate_limits)
+DEFAULT_RATE_LIMIT = {
+    'requests_per_minute': 60,
+    'burst': 5,
+    'max_retries': 4,
+    'backoff_base': 1.0,
+    'backoff_max': 60.0,
+}
+
+# Responses worth retrying: rate limited or a transient server error
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_buckets = {}
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second refill up to `capacity`,
+    and each request takes one token (or its size, e.g. LLM tokens),
+    waiting until enough are available.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, amount=1):
+        """
+        Take `amount` tokens (capped at the capacity), waiting until they are available.
+        """
+        amount = min(amount, self.capacity)
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """
+        Drain the bucket so no request is released for `seconds` (e.g. after a 429).
+        """
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+        self.updated = time.monotonic()
+
+def get_provider_config(provider):
+    """
+    Return the rate limit and retry settings for a provider, filled with defaults.
+    """
+    configured = (get_setting('rate_limits') or {}).get(provider) or {}
+    return {**DEFAULT_RATE_LIMIT, **configured}
+
+def get_bucket(provider):
+    """
+    Return the shared token bucket for a provider.
+    """
+    if provider not in _buckets:
+        config = get_provider_config(provider)
+        _buckets[provider] = TokenBucket(
+            rate=float(config['requests_per_minute']) / 60.0,
+            capacity=max(1.0, float(config['burst'])),
+        )
+    return _buckets[provider]
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header (seconds or an HTTP date) into seconds, or None.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+def backoff_delay(config, attempt, retry_after=None):
+    """
+    Seconds to wait before retry number `attempt` (0-based): the server's
+    Retry-After when given, otherwise exponential backoff with full jitter.
+    Both are capped at backoff_max.
+    """
+    if retry_after is not None:
+        return min(retry_after, float(config['backoff_max']))
+    ceiling = min(float(config['backoff_max']), float(config['backoff_base']) * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+async def request_with_retry(provider, method, url, **kwargs):
+    """
+    Send a request through the shared HTTP client, paced by the provider's
+    token bucket and retried with jittered exponential backoff on 429/5xx
+    responses and transport errors.
+
+    Returns the last response (callers check its status code as usual);
+    transport errors are re-raised once retries are exhausted.
+    """
+    config = get_provider_config(provider)
+    bucket = get_bucket(provider)
+    max_retries = int(config['max_retries'])
+
+    for attempt in range(max_retries + 1):
+        await bucket.acquire()
+        try:
+            response = await get_http_client().request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if attempt == max_retries:
+                raise
+            metrics.add(retries=1)
+            delay = backoff_delay(config, attempt)
+            print(f"{provider} request failed ({e}); retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+            continue
+
+        metrics.add(bytes=len(response.content))
+        if response.status_code not in RETRY_STATUS_CODES or attempt == max_retries:
+            return response
+
+        metrics.add(retries=1)
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        delay = backoff_delay(config, attempt, retry_after)
+        if response.status_code == 429:
+            # Hold back every other request to this provider as well
+            bucket.pause(delay)
+        print(f"{provider} returned {response.status_code}; retrying in {delay:.1f}s "
+              f"(attempt {attempt + 1}/{max_retries})...")
+        await asyncio.sleep(delay)
+
+async def call_with_retry(provider, func, *args, retry_on=(), get_retry_after=None):
+    """
+    Await func(*args) paced by the provider's token bucket, retrying with
+    jittered exponential backoff when it raises one of `retry_on`. Used for
+    clients that make their own HTTP calls (asyncpraw). `get_retry_after`
+    extracts a Retry-After value from the exception, if it has one.
+    """
+    config = get_provider_config(provider)
+    bucket = get_bucket(provider)
+    max_retries = int(config['max_retries'])
+
+    for attempt in range(max_retries + 1):
+        await bucket.acquire()
+        try:
+            return await func(*args)
+        except retry_on as e:
+            if attempt == max_retries:
+                raise
+            metrics.add(retries=1)
+            retry_after = parse_retry_after(get_retry_after(e)) if get_retry_after else None
+            delay = backoff_delay(config, attempt, retry_after)
+            print(f"{provider} call failed ({e}); retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{max_retries})...")
+            await asyncio.sleep(delay)
@@ -0,0 +1,95 @@
+# scheduler.py
+
+import asyncio
+from typing import Callable, NamedTuple, Optional
+from checkpoints import hash_inputs
+from metrics import stage as timed_stage, record
+
+class Stage(NamedTuple):
+    name: str
+    run: Callable                        # async run(asset, inputs) -> output (str) or None
+    requires: tuple = ()                 # stages that must have succeeded first
+    after: tuple = ()                    # stages that must have finished first, successfully or not
+    params: Optional[Callable] = None    # params(asset) -> extra inputs hashed into the checkpoint
+    action: Optional[str] = None         # for error messages: "Failed to <action> for <asset>"
+    keep: Optional[Callable] = None      # keep(output) -> whether to checkpoint the output
+
+class StageGraph:
+    """
+    Per-asset pipeline stages and their dependencies.
+
+    Each stage's input hash covers its params and the outputs of the stages
+    it depends on. A stage whose checkpoint has the same input hash is
+    skipped and its recorded output reused; otherwise it runs as soon as its
+    dependencies are done, concurrently with independent stages. A stage's
+    output is what run() returns, or its input hash when that is None.
+    """
+
+    def __init__(self, stages):
+        self.stages = {}
+        # Stages can only depend on stages listed before them, so list order is a topological order
+        for stage in stages:
+            unknown = [dep for dep in stage.requires + stage.after if dep not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage {stage.name} depends on unknown or later stages {unknown}.")
+            self.stages[stage.name] = stage
+
+    def input_hash(self, asset, name, outputs):
+        stage = self.stages[name]
+        deps = stage.requires + stage.after
+        params = stage.params(asset) if stage.params else None
+        return hash_inputs(name, asset, params, {dep: outputs.get(dep) for dep in deps})
+
+    def resume(self, asset, name, outputs, checkpoints):
+        """
+        Reuse the stage's checkpoint if its inputs are unchanged. Returns True
+        when the stage's output is now in `outputs`.
+        """
+        if name in outputs:
+            return True
+        output = checkpoints.get(asset, name, self.input_hash(asset, name, outputs))
+        if output is None:
+            return False
+        outputs[name] = output
+        record(name, asset, skipped=1)
+        return True
+
+    def complete(self, asset, name, outputs, checkpoints, output=None):
+        """
+        Record a stage that was run outside the graph (e.g. for many assets at
+        once) and checkpoint it. Blocking; call from a worker thread.
+        """
+        stage = self.stages[name]
+        input_hash = self.input_hash(asset, name, outputs)
+        outputs[name] = input_hash if output is None else output
+        if stage.keep is None or stage.keep(outputs[name]):
+            checkpoints.save(asset, name, input_hash, outputs[name])
+
+    async def run(self, asset, names, outputs, checkpoints):
+        """
+        Run the named stages for an asset, skipping those already in `outputs`
+        or resumable from a checkpoint. Dependencies outside `names` must
+        already be in `outputs`. A failed stage is reported and its dependents
+        (through `requires`) are not run.
+        """
+        tasks = {}
+
+        async def run_stage(stage):
+            deps = stage.requires + stage.after
+            await asyncio.gather(*(tasks[dep] for dep in deps if dep in tasks))
+            if any(dep not in outputs for dep in stage.requires):
+                return
+            if self.resume(asset, stage.name, outputs, checkpoints):
+                return
+            try:
+                with timed_stage(stage.name, asset):
+                    output = await stage.run(asset, {dep: outputs.get(dep) for dep in deps})
+            except Exception as e:
+                print(f"Failed to {stage.action or 'run ' + stage.name} for {asset}: {e}")
+                return
+            await asyncio.to_thread(self.complete, asset, stage.name, outputs, checkpoints, output)
+
+        for name, stage in self.stages.items():
+            if name in names and name not in outputs:
+                tasks[name] = asyncio.create_task(run_stage(stage))
+        await asyncio.gather(*tasks.values())
@@ -0,0 +1,159 @@
+# snapshots.py
+
+import os
+import json
+import pandas as pd
+from storage import (
+    get_data_dir, read_asset_data, get_asset_columns, read_indicator_state, get_news_path, get_reddit_path
+)
+
+# Windows (days) of the price changes kept in a snapshot; the first is the summary lookback
+RETURN_WINDOWS = (30, 365)
+# Days of daily returns behind the volatility figure
+VOLATILITY_DAYS = 30
+# News headlines and Reddit posts kept per asset
+FEED_ITEMS = 5
+# Stored columns that are prices or volumes rather than indicators
+PRICE_COLUMNS = {'Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'price', 'volume', 'market_cap'}
+
+def get_snapshot_path(asset):
+    """
+    Return the path of an asset's snapshot record.
+    """
+    return os.path.join(get_data_dir(), f"{asset}_snapshot.json")
+
+def read_asset_snapshot(asset):
+    """
+    Load an asset's snapshot record, or None if there is none.
+    """
+    path = get_snapshot_path(asset)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Failed to read snapshot for {asset}: {e}")
+        return None
+
+def write_asset_snapshot(asset, snapshot):
+    """
+    Store an asset's snapshot record (written to a temporary file and moved into place).
+    """
+    path = get_snapshot_path(asset)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+def _number(value):
+    """
+    Round a value for the snapshot, or None when missing.
+    """
+    if value is None or pd.isna(value):
+        return None
+    return round(float(value), 4)
+
+def build_market_snapshot(df, indicator_columns):
+    """
+    Summarize processed bars (indexed by date, with a 'Close' column) into
+    the latest close, volume and indicator values, the % change over each
+    RETURN_WINDOWS window and the daily volatility over VOLATILITY_DAYS.
+    Only the bars of the longest window are touched.
+    """
+    if df.empty:
+        return {'as_of': None, 'close': None}
+    # The index is sorted, so the window starts are found by binary search
+    df = df.iloc[df.index.searchsorted(df.index[-1] - pd.Timedelta(days=max(RETURN_WINDOWS))):]
+    close = df['Close'].dropna()
+    if close.empty:
+        return {'as_of': None, 'close': None}
+    end_date = close.index[-1]
+    latest = df.iloc[-1]
+
+    returns = {}
+    for days in RETURN_WINDOWS:
+        window = close[close.index >= end_date - pd.Timedelta(days=days)]
+        if len(window) > 1:
+            returns[str(days)] = _number((window.iloc[-1] - window.iloc[0]) / window.iloc[0] * 100)
+        else:
+            returns[str(days)] = None
+
+    recent = close[close.index >= end_date - pd.Timedelta(days=VOLATILITY_DAYS)]
+    daily_returns = recent.resample('D').last().dropna().pct_change().dropna()
+    volatility = daily_returns.std() * 100 if len(daily_returns) > 1 else None
+
+    volume_column = next((c for c in ('Volume', 'volume') if c in df.columns), None)
+    return {
+        'as_of': end_date.isoformat(),
+        'close': _number(close.iloc[-1]),
+        'volume': _number(latest[volume_column]) if volume_column else None,
+        'market_cap': _number(latest['market_cap']) if 'market_cap' in df.columns else None,
+        'returns_pct': returns,
+        'daily_volatility_pct': _number(volatility),
+        'indicators': {c: _number(latest[c]) for c in indicator_columns if c in df.columns},
+    }
+
+def update_market_snapshot(asset, df, indicator_columns):
+    """
+    Refresh the market part of an asset's snapshot from its processed data.
+    Called by process_data.py while the frame is still in memory.
+    """
+    snapshot = read_asset_snapshot(asset) or {'asset': asset}
+    snapshot['market'] = build_market_snapshot(df, indicator_columns)
+    write_asset_snapshot(asset, snapshot)
+
+def load_feed_items(asset):
+    """
+    Read the top FEED_ITEMS news headlines (newest first) and Reddit posts
+    (highest score first) stored for an asset.
+    """
+    news, reddit = [], []
+    news_file = get_news_path(asset)
+    if os.path.exists(news_file):
+        df_news = pd.read_csv(news_file, nrows=FEED_ITEMS)
+        news = df_news[['title', 'description', 'url']].astype(object).where(df_news.notna(), None).to_dict('records')
+    reddit_file = get_reddit_path(asset)
+    if os.path.exists(reddit_file):
+        df_reddit = pd.read_csv(reddit_file).nlargest(FEED_ITEMS, 'score')
+        reddit = df_reddit[['title', 'score', 'subreddit']].astype(object).to_dict('records')
+    return news, reddit
+
+def update_feed_snapshot(asset):
+    """
+    Refresh the news and Reddit part of an asset's snapshot from the fetched
+    feeds. Returns the snapshot.
+    """
+    snapshot = read_asset_snapshot(asset) or {'asset': asset}
+    snapshot['news'], snapshot['reddit'] = load_feed_items(asset)
+    write_asset_snapshot(asset, snapshot)
+    return snapshot
+
+def build_asset_snapshot(asset):
+    """
+    Build an asset's full snapshot from its stored data and feeds, for
+    assets processed before snapshots existed. Returns None if there is no
+    stored data.
+    """
+    df = read_asset_data(asset)
+    if df is None:
+        return None
+    if 'price' in df.columns and 'Close' not in df.columns:
+        df = df.rename(columns={'price': 'Close'})
+    if 'Close' not in df.columns:
+        return None
+    state = read_indicator_state(asset) or {}
+    indicator_columns = state.get('columns') or [c for c in get_asset_columns(asset) if c not in PRICE_COLUMNS]
+    snapshot = {'asset': asset, 'market': build_market_snapshot(df, indicator_columns)}
+    snapshot['news'], snapshot['reddit'] = load_feed_items(asset)
+    write_asset_snapshot(asset, snapshot)
+    return snapshot
+
+def get_asset_snapshot(asset):
+    """
+    Return an asset's snapshot record, building it from stored data if it is missing.
+    """
+    snapshot = read_asset_snapshot(asset)
+    if snapshot is None or 'market' not in snapshot:
+        snapshot = build_asset_snapshot(asset)
+    return snapshot
@@ -0,0 +1,258 @@
+# storage.py
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from utils import get_setting
+
+# File extension used by each supported storage format
+FORMAT_EXTENSIONS = {
+    'parquet': 'parquet',
+    'feather': 'feather',
+    'csv': 'csv',
+}
+
+# Names used for the datetime index of stored asset data
+DATE_COLUMNS = ('Date', 'datetime')
+
+# Largest magnitude a float32 column can hold
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+# Columns kept as float64 by compact_frame unless settings.yaml float64_columns says otherwise:
+# prices, volumes and market caps, whose magnitudes need more than float32's ~7 digits
+DEFAULT_FLOAT64_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'price', 'volume', 'market_cap')
+
+def get_data_dir():
+    """
+    Return the top-level data directory, creating it if needed. The
+    INVESTMENT_DATA_DIR environment variable overrides the default <repo>/data.
+    """
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    data_dir = os.getenv('INVESTMENT_DATA_DIR') or os.path.join(base_dir, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+def get_storage_format():
+    """
+    Return the configured storage format (settings.yaml: storage_format).
+
+    Columnar formats need pyarrow; without it storage falls back to CSV.
+    """
+    fmt = str(get_setting('storage_format', 'parquet')).lower()
+    if fmt not in FORMAT_EXTENSIONS:
+        print(f"Unknown storage format '{fmt}', using csv.")
+        return 'csv'
+    if fmt != 'csv':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print(f"pyarrow is not installed; storing asset data as csv instead of {fmt}.")
+            return 'csv'
+    return fmt
+
+def get_asset_path(asset, fmt=None):
+    """
+    Return the path of the stored data file for an asset.
+    """
+    fmt = fmt or get_storage_format()
+    return os.path.join(get_data_dir(), f"{asset}_data.{FORMAT_EXTENSIONS[fmt]}")
+
+def _find_asset_file(asset):
+    """
+    Locate the stored file for an asset, returning (path, format) or (None, None).
+
+    Legacy CSV files are still found when a columnar format is configured, so
+    existing histories are picked up and migrated on the next write.
+    """
+    fmt = get_storage_format()
+    path = get_asset_path(asset, fmt)
+    if os.path.exists(path):
+        return path, fmt
+    csv_path = get_asset_path(asset, 'csv')
+    if fmt != 'csv' and os.path.exists(csv_path):
+        return csv_path, 'csv'
+    return None, None
+
+def asset_data_exists(asset):
+    """
+    Check whether any stored data exists for an asset.
+    """
+    return _find_asset_file(asset)[0] is not None
+
+def _read_columns(path, fmt):
+    """
+    Return the column names stored in a file, including the date column.
+    """
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return [c for c in pq.read_schema(path).names if not c.startswith('__index_level_')]
+    if fmt == 'feather':
+        # Feather v2 is the Arrow IPC file format; the schema is read from the footer
+        import pyarrow.ipc as ipc
+        with ipc.open_file(path) as reader:
+            return reader.schema.names
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+def get_asset_columns(asset):
+    """
+    List the data columns (excluding the date index) stored for an asset.
+    """
+    path, fmt = _find_asset_file(asset)
+    if path is None:
+        return []
+    return [c for c in _read_columns(path, fmt) if c not in DATE_COLUMNS]
+
+def read_asset_data(asset, columns=None):
+    """
+    Load stored data for an asset as a DataFrame with a sorted DatetimeIndex.
+
+    `columns` limits the load to the given columns (missing ones are ignored);
+    only those columns are read from disk for columnar formats.
+    Returns None if no data is stored for the asset.
+    """
+    path, fmt = _find_asset_file(asset)
+    if path is None:
+        return None
+
+    stored_columns = _read_columns(path, fmt)
+    date_col = next((c for c in DATE_COLUMNS if c in stored_columns), None)
+    if columns is not None:
+        columns = [c for c in columns if c in stored_columns and c not in DATE_COLUMNS]
+
+    if fmt == 'parquet':
+        df = pd.read_parquet(path, columns=columns)
+        if date_col is not None and df.index.name != date_col:
+            df = df.set_index(date_col)
+    elif fmt == 'feather':
+        wanted = None if columns is None else ([date_col] if date_col else []) + columns
+        df = pd.read_feather(path, columns=wanted)
+        if date_col is not None:
+            df = df.set_index(date_col)
+    else:
+        if date_col is None:
+            print(f"No recognized date column in {path}.")
+            return None
+        usecols = None if columns is None else [date_col] + columns
+        df = pd.read_csv(path, usecols=usecols, parse_dates=[date_col], index_col=date_col)
+
+    if not isinstance(df.index, pd.DatetimeIndex):
+        df.index = pd.to_datetime(df.index, errors='coerce')
+    df = df[df.index.notna()]
+    df.sort_index(inplace=True)
+    if compact_dtypes_enabled():
+        df = compact_frame(df)
+    return df
+
+def compact_dtypes_enabled():
+    """
+    Whether asset data is kept in compact dtypes in memory and on disk
+    (settings.yaml: compact_dtypes).
+    """
+    return bool(get_setting('compact_dtypes', True))
+
+def compact_frame(df):
+    """
+    Return df with float64 columns stored as float32 and integer columns
+    downcast to the smallest type that holds their values, roughly halving
+    the memory of the indicator columns.
+
+    float32 keeps about 7 significant digits, ample for indicators but not
+    for volumes and market caps (~1e12) or large prices; columns listed in
+    settings.yaml float64_columns (prices, volumes and market caps by
+    default), or with values beyond the float32 range, keep float64.
+    """
+    keep = get_setting('float64_columns')
+    keep = set(DEFAULT_FLOAT64_COLUMNS if keep is None else keep)
+    dtypes = {}
+    for col, dtype in df.dtypes.items():
+        if col in keep:
+            continue
+        if dtype == np.float64:
+            values = df[col].to_numpy()
+            finite = values[np.isfinite(values)]
+            if finite.size == 0 or np.abs(finite).max() <= FLOAT32_MAX:
+                dtypes[col] = np.float32
+        elif dtype.kind in 'iu':
+            downcast = pd.to_numeric(df[col], downcast='unsigned' if dtype.kind == 'u' else 'integer')
+            if downcast.dtype != dtype:
+                dtypes[col] = downcast.dtype
+    return df.astype(dtypes) if dtypes else df
+
+def read_last_timestamp(asset):
+    """
+    Return the latest stored timestamp for an asset without loading its data
+    columns, or None if there is no stored history.
+    """
+    df = read_asset_data(asset, columns=[])
+    if df is None or len(df.index) == 0:
+        return None
+    return df.index.max()
+
+def write_asset_data(asset, df):
+    """
+    Store an asset's DataFrame (indexed by date) in the configured format.
+
+    The file is written to a temporary path and moved into place, so readers
+    never see a partially written file. A legacy CSV is removed once the data
+    has been stored in a columnar format.
+    """
+    fmt = get_storage_format()
+    path = get_asset_path(asset, fmt)
+    tmp_path = f"{path}.tmp"
+    if compact_dtypes_enabled():
+        df = compact_frame(df)
+
+    if fmt == 'parquet':
+        df.to_parquet(tmp_path)
+    elif fmt == 'feather':
+        df.reset_index().to_feather(tmp_path)
+    else:
+        df.to_csv(tmp_path)
+    os.replace(tmp_path, path)
+
+    csv_path = get_asset_path(asset, 'csv')
+    if fmt != 'csv' and os.path.exists(csv_path):
+        os.remove(csv_path)
+    return path
+
+def get_news_path(asset):
+    """
+    Return the path of the CSV holding an asset's latest news headlines.
+    """
+    return os.path.join(get_data_dir(), f"news_{asset}_data.csv")
+
+def get_reddit_path(asset):
+    """
+    Return the path of the CSV holding an asset's latest Reddit posts.
+    """
+    return os.path.join(get_data_dir(), f"reddit_{asset}_data.csv")
+
+def get_indicator_state_path(asset):
+    """
+    Return the path of the persisted indicator state for an asset.
+    """
+    return os.path.join(get_data_dir(), f"{asset}_indicator_state.json")
+
+def read_indicator_state(asset):
+    """
+    Load the persisted indicator state for an asset, or None if there is none.
+    """
+    path = get_indicator_state_path(asset)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Failed to read indicator state for {asset}: {e}")
+        return None
+
+def write_indicator_state(asset, state):
+    """
+    Persist indicator state for an asset next to its price data.
+    """
+    path = get_indicator_state_path(asset)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
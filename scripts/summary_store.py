@@ -0,0 +1,101 @@
+# summary_store.py
+
+import os
+import sqlite3
+import datetime
+import pandas as pd
+from storage import get_data_dir
+
+# Summaries written by daily_run.py before the SQLite store existed
+LEGACY_SUMMARY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'daily_summaries.csv')
+
+def get_summary_db_path():
+    """
+    Return the path of the SQLite database holding daily summaries.
+    """
+    return os.path.join(get_data_dir(), 'daily_summaries.db')
+
+def _connect():
+    """
+    Open the summaries database, creating the table (and importing the legacy
+    CSV) on first use. WAL mode and a busy timeout let concurrent writers and
+    readers share the file.
+    """
+    db_path = get_summary_db_path()
+    is_new = not os.path.exists(db_path)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_summaries (
+            date TEXT NOT NULL,
+            asset TEXT NOT NULL,
+            source TEXT,
+            summary TEXT,
+            PRIMARY KEY (date, asset)
+        )
+    """)
+    if is_new:
+        _import_legacy_csv(conn)
+    return conn
+
+def _import_legacy_csv(conn):
+    """
+    Copy rows from the old scripts/data/daily_summaries.csv into the table.
+    Later rows win for repeated (date, asset) pairs, as with reruns.
+    """
+    if not os.path.exists(LEGACY_SUMMARY_FILE):
+        return
+    try:
+        df = pd.read_csv(LEGACY_SUMMARY_FILE)
+        rows = df[['date', 'asset', 'source', 'summary']].astype(object).where(df.notna(), None)
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO daily_summaries (date, asset, source, summary) VALUES (?, ?, ?, ?)",
+                rows.itertuples(index=False, name=None),
+            )
+        print(f"Imported {len(df)} rows from {LEGACY_SUMMARY_FILE}.")
+    except Exception as e:
+        print(f"Failed to import legacy daily summaries: {e}")
+
+def save_daily_summary(asset, source, summary, date=None):
+    """
+    Store one asset's summary for a date (default today). Rerunning the same
+    day replaces the previous summary instead of adding a duplicate row.
+    """
+    date_str = (date or datetime.date.today()).strftime("%Y-%m-%d")
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO daily_summaries (date, asset, source, summary) VALUES (?, ?, ?, ?)
+                ON CONFLICT(date, asset) DO UPDATE SET source = excluded.source, summary = excluded.summary
+                """,
+                (date_str, asset, source, summary),
+            )
+    finally:
+        conn.close()
+
+def load_summaries(start_date, end_date=None):
+    """
+    Load summaries dated from start_date to end_date (inclusive) as a
+    DataFrame with date, asset, source (categorical) and summary columns. Only the
+    requested range is read, using the (date, asset) primary key index.
+    """
+    query = "SELECT date, asset, source, summary FROM daily_summaries WHERE date >= ?"
+    params = [start_date.strftime("%Y-%m-%d")]
+    if end_date is not None:
+        query += " AND date <= ?"
+        params.append(end_date.strftime("%Y-%m-%d"))
+    query += " ORDER BY date, asset"
+
+    conn = _connect()
+    try:
+        df = pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    # Few distinct assets/sources repeat across many rows
+    df['asset'] = df['asset'].astype('category')
+    df['source'] = df['source'].astype('category')
+    return df
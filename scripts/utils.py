@@ -1,11 +1,13 @@
 # utils.py
 import os
-import yaml
+from functools import lru_cache
 
 def load_config(file_path):
     """
     Load a YAML configuration file.
     """
+    import yaml
+
     if not os.path.exists(file_path):
         print(f"Configuration file {file_path} does not exist.")
         return {}
@@ -19,9 +21,9 @@ def load_config(file_path):
 # Define the base directory as the parent of the current directory
 base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-# Load portfolio and settings configurations
-portfolio = load_config(os.path.join(base_dir, 'config', 'portfolio.yaml'))
-settings = load_config(os.path.join(base_dir, 'config', 'settings.yaml'))
+# Configuration files, parsed on first use rather than at import time
+PORTFOLIO_FILE = os.path.join(base_dir, 'config', 'portfolio.yaml')
+SETTINGS_FILE = os.path.join(base_dir, 'config', 'settings.yaml')
 
 # Load secrets from environment variables
 secrets = {
@@ -34,10 +36,30 @@ secrets = {
     "reddit_user_agent": os.getenv("REDDIT_USER_AGENT"),
 }
 
-def is_crypto(asset):
+@lru_cache(maxsize=None)
+def get_portfolio():
+    """
+    Return the parsed portfolio.yaml, loading it on first call.
+    """
+    return load_config(PORTFOLIO_FILE) or {}
+
+@lru_cache(maxsize=None)
+def get_settings():
+    """
+    Return the parsed settings.yaml, loading it on first call.
+    """
+    return load_config(SETTINGS_FILE) or {}
+
+def __getattr__(name):
+    # utils.portfolio and utils.settings still work, loading the file on first access
+    if name == 'portfolio':
+        return get_portfolio()
+    if name == 'settings':
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_setting(name, default=None):
     """
-    Check if the asset is listed under crypto in either portfolio or watchlist.
+    Look up a value under the 'settings' section of settings.yaml.
     """
-    crypto_assets = portfolio.get('portfolio', {}).get('crypto', []) + \
-                    portfolio.get('watchlist', {}).get('crypto', [])
-    return asset in crypto_assets
+    return (get_settings().get('settings') or {}).get(name, default)
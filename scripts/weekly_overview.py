@@ -1,70 +1,31 @@
 # weekly_overview.py
 
-import os
-import pandas as pd
 import datetime
-from openai import OpenAI  # Updated import for openai>=1.0.0
-import requests
-from utils import portfolio, settings, secrets
+import asyncio
+from utils import secrets, get_setting
+from notifications import send_telegram_message
+from http_client import close_http_clients
+from summary_store import load_summaries
+from snapshots import read_asset_snapshot
+from metrics import stage, start_run, write_run_report
+from llm_client import chat_completion, estimate_tokens, get_llm_timeout, LLMBudgetExceeded
 
-# Initialize OpenAI client with the API key from environment variables
-client = OpenAI(
-    api_key=secrets.get('openai_api_key')  # Optional: Defaults to environment variable
-)
+# Map step of the map-reduce overview: per-asset weekly digests
+DIGEST_MODEL = "gpt-3.5-turbo"
+DIGEST_WORDS = 120
+DIGEST_MAX_TOKENS = 300
 
-# Verify that the OpenAI API key is set
-if not client.api_key:
-    raise ValueError("OPENAI_API_KEY is not set in the environment variables.")
-
-
-def send_telegram_message(message, bot_token, chat_id):
-    """
-    Send a message to a Telegram chat using the provided bot token and chat ID.
-    """
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    params = {
-        "chat_id": chat_id,
-        "text": message,
-        "parse_mode": "Markdown"  # Optional: for better formatting
-    }
-    try:
-        response = requests.post(url, params=params)
-        response.raise_for_status()
-        print("Weekly overview sent to Telegram.")
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to send message to Telegram: {e}")
-
-
-def generate_weekly_overview():
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    data_dir = os.path.join(base_dir, 'data')
-    daily_summary_file = os.path.join(data_dir, "daily_summaries.csv")
-
-    if not os.path.exists(daily_summary_file):
-        return "No daily summaries found."
 
+async def generate_weekly_overview():
+    # Only the last 7 days are read from the summary store
+    today = datetime.datetime.now()
+    one_week_ago = today - datetime.timedelta(days=7)
     try:
-        df = pd.read_csv(daily_summary_file)
+        recent_data = await asyncio.to_thread(load_summaries, one_week_ago)
     except Exception as e:
         print(f"Failed to read daily summaries: {e}")
         return "Failed to read daily summaries."
 
-    # Ensure the 'date' column is in datetime format
-    if 'date' not in df.columns:
-        print("The 'date' column is missing from daily_summaries.csv.")
-        return "Invalid daily summaries format."
-
-    try:
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    except Exception as e:
-        print(f"Failed to parse dates: {e}")
-        return "Invalid date format in daily summaries."
-
-    # Filter for the last 7 days
-    today = datetime.datetime.now()
-    one_week_ago = today - datetime.timedelta(days=7)
-    recent_data = df[df['date'] >= one_week_ago]
-
     if recent_data.empty:
         return "No recent summaries to analyze."
 
@@ -76,16 +37,40 @@ def generate_weekly_overview():
     if portfolio_summaries.empty and watchlist_summaries.empty:
         return "No portfolio or watchlist summaries available for the past week."
 
+    # Digests already carry each asset's current snapshot
+    snapshot_text = ""
+    if get_setting('weekly_overview_mode', 'single') == 'map_reduce':
+        # Map: one digest per asset; reduce: combine digests until both sections
+        # together fit weekly_overview_context_tokens
+        section_limit = int(get_setting('weekly_overview_context_tokens', 4000)) // 2
+        try:
+            portfolio_text, watchlist_text = await asyncio.gather(
+                digest_section(portfolio_summaries, section_limit), digest_section(watchlist_summaries, section_limit)
+            )
+        except LLMBudgetExceeded as e:
+            print(e)
+            return budget_exhausted_overview(portfolio_summaries, watchlist_summaries)
+        heading = "weekly digests of all assets"
+    else:
+        portfolio_text = portfolio_summaries[['date', 'asset', 'summary']].to_string(index=False)
+        watchlist_text = watchlist_summaries[['date', 'asset', 'summary']].to_string(index=False)
+        # Current figures come from the per-asset snapshot records, not the price history
+        snapshots = await asyncio.to_thread(lambda: [snapshot_line(asset) for asset in recent_data['asset'].unique()])
+        current = "\n".join(line for line in snapshots if line)
+        if current:
+            snapshot_text = f"\n**Current Snapshots:**\n{current}\n"
+        heading = "daily summaries from the past week for all assets"
+
     # Construct prompt for GPT-4
     prompt = f"""
-You are a sophisticated financial analyst. Below are the daily summaries from the past week for all assets in the portfolio and watchlist.
+You are a sophisticated financial analyst. Below are the {heading} in the portfolio and watchlist.
 
 **Portfolio Assets Summaries (Past Week):**
-{portfolio_summaries[['date', 'asset', 'summary']].to_string(index=False)}
+{portfolio_text}
 
 **Watchlist Assets Summaries (Past Week):**
-{watchlist_summaries[['date', 'asset', 'summary']].to_string(index=False)}
-
+{watchlist_text}
+{snapshot_text}
 Use this data to:
 1. Identify key trends or shifts in the portfolio assets.
 2. Determine if any watchlist assets have shown enough positive signs to justify adding them to the portfolio.
@@ -96,7 +81,7 @@ Your response should be a single comprehensive summary message, focusing on stra
 """
 
     try:
-        response = client.chat.completions.create(
+        overview = await chat_completion(
             model="gpt-4",
             messages=[
                 {
@@ -111,17 +96,149 @@ Your response should be a single comprehensive summary message, focusing on stra
             max_tokens=2000,
             temperature=0.7
         )
+    except LLMBudgetExceeded as e:
+        print(e)
+        return budget_exhausted_overview(portfolio_summaries, watchlist_summaries)
+    except asyncio.TimeoutError:
+        print("OpenAI API request for the weekly overview timed out.")
+        return "Failed to generate weekly overview."
     except Exception as e:
         print(f"OpenAI API request failed: {e}")
         return "Failed to generate weekly overview."
 
-    overview = response.choices[0].message.content.strip()
     return overview
 
 
-if __name__ == "__main__":
+
+def budget_exhausted_overview(portfolio_summaries, watchlist_summaries):
+    return (f"Weekly overview unavailable: the LLM budget for this run is exhausted. "
+            f"{len(portfolio_summaries)} portfolio and {len(watchlist_summaries)} watchlist "
+            f"summaries were recorded this week.")
+
+
+def snapshot_line(asset):
+    """
+    One line with an asset's current close, returns, volatility and RSI from
+    its snapshot record, or "" if it has none.
+    """
+    market = (read_asset_snapshot(asset) or {}).get('market') or {}
+    if market.get('close') is None:
+        return ""
+    returns = market.get('returns_pct') or {}
+    rsi = next((value for column, value in (market.get('indicators') or {}).items() if 'RSI' in column), None)
+    return (f"Current snapshot of {asset} ({market['as_of'][:10]}): close {market['close']}, "
+            f"30-day change {returns.get('30')}%, 1-year change {returns.get('365')}%, "
+            f"daily volatility {market.get('daily_volatility_pct')}%, RSI {rsi}")
+
+
+async def digest_asset_week(asset, rows):
+    """
+    Condense one asset's daily summaries from the week into a short digest.
+
+    The request is content-addressed by the LLM cache, so reruns over the
+    same summaries reuse the stored digest. If the request fails, the
+    asset's latest summary (truncated) stands in for the digest.
+    """
+    daily = "\n".join(f"{date:%Y-%m-%d}: {summary}" for date, summary in zip(rows['date'], rows['summary']))
+    current = await asyncio.to_thread(snapshot_line, asset)
+    prompt = f"""
+Condense the following daily summaries of {asset} from the past week into a digest of at most {DIGEST_WORDS} words.
+Keep the price trend, notable indicator readings (RSI, MACD), major news or sentiment, and the most recent recommended action.
+
+{daily}
+{current}
+"""
+    try:
+        digest = await chat_completion(
+            model=DIGEST_MODEL,
+            messages=[
+                {"role": "system", "content": "You condense financial analyses into short, factual digests."},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=DIGEST_MAX_TOKENS,
+            temperature=0
+        )
+    except LLMBudgetExceeded:
+        raise
+    except Exception as e:
+        print(f"Failed to digest weekly summaries for {asset}: {e}")
+        digest = str(rows['summary'].iloc[-1])[:DIGEST_WORDS * 6]
+    return f"{asset}: {digest}"
+
+
+async def reduce_digests(digests, limit):
+    """
+    Merge groups of digests into combined digests, one level at a time,
+    until the text fits `limit` tokens.
+    """
+    while len(digests) > 1 and estimate_tokens([{'content': "\n".join(digests)}]) > limit:
+        groups, group, used = [], [], 0
+        for digest in digests:
+            tokens = estimate_tokens([{'content': digest}])
+            if group and used + tokens > limit:
+                groups.append(group)
+                group, used = [], 0
+            group.append(digest)
+            used += tokens
+        groups.append(group)
+        if len(groups) == len(digests):
+            # Every digest is already as large as the limit; nothing left to merge
+            break
+        print(f"Reducing {len(digests)} digests into {len(groups)}...")
+        digests = await asyncio.gather(*(_merge_digests(group) for group in groups))
+    return "\n".join(digests)
+
+
+async def _merge_digests(group):
+    """
+    Combine a group of digests into one with a single LLM request. If the
+    request fails, the group's digests are concatenated, each truncated to
+    its share of the merged digest's length.
+    """
+    digests = "\n".join(group)
+    prompt = f"""
+Combine these asset digests into one digest of at most {DIGEST_WORDS * 2} words.
+Keep every asset name with its trend and recommended action; drop repetition.
+
+{digests}
+"""
+    try:
+        return await chat_completion(
+            model=DIGEST_MODEL,
+            messages=[
+                {"role": "system", "content": "You condense financial analyses into short, factual digests."},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=DIGEST_MAX_TOKENS * 2,
+            temperature=0,
+            # Merges read and write twice as much as a single digest
+            timeout=get_llm_timeout(DIGEST_MODEL) * 2
+        )
+    except LLMBudgetExceeded:
+        raise
+    except Exception as e:
+        print(f"Failed to merge {len(group)} digests: {e}")
+        share = DIGEST_WORDS * 2 * 6 // len(group)
+        return "\n".join(digest[:share] for digest in group)
+
+
+async def digest_section(summaries, limit):
+    """
+    Map-reduce the summaries of one section (portfolio or watchlist): digest
+    every asset's week in parallel, then reduce the digests to `limit` tokens.
+    """
+    if summaries.empty:
+        return "(none)"
+    digests = await asyncio.gather(*(digest_asset_week(asset, rows)
+                                     for asset, rows in summaries.groupby('asset', sort=True, observed=True)))
+    return await reduce_digests(list(digests), limit)
+
+
+async def main():
+    start_run('weekly_overview')
     try:
-        overview = generate_weekly_overview()
+        with stage('overview'):
+            overview = await generate_weekly_overview()
         print("=== Weekly Overview ===")
         print(overview)
 
@@ -132,7 +249,18 @@ if __name__ == "__main__":
         if not bot_token or not chat_id:
             print("Telegram bot token or chat ID is not set. Skipping Telegram message.")
         else:
-            send_telegram_message(overview, bot_token, chat_id)
+            with stage('notify'):
+                await send_telegram_message(overview, bot_token, chat_id)
+    finally:
+        try:
+            write_run_report()
+        except Exception as e:
+            print(f"Failed to write run metrics: {e}")
+        await close_http_clients()
+
 
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
     except Exception as e:
         print(f"Weekly overview generation failed: {e}")
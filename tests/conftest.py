@@ -0,0 +1,57 @@
+# conftest.py
+
+import os
+import sys
+import pytest
+
+# The pipeline modules are flat scripts imported by name, as daily_run.py does
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+
+def _clear_config_caches():
+    import utils
+    import assets
+
+    utils.get_portfolio.cache_clear()
+    utils.get_settings.cache_clear()
+    assets.get_asset_registry.cache_clear()
+    assets._symbols_by.cache_clear()
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    Point storage at an empty scratch data directory.
+    """
+    path = tmp_path / 'data'
+    path.mkdir()
+    monkeypatch.setenv('INVESTMENT_DATA_DIR', str(path))
+    return path
+
+
+@pytest.fixture
+def stand_ins(tmp_path, monkeypatch):
+    """
+    A synthetic 10-asset universe wired to the benchmark's local stand-ins
+    for every external service, with request retries switched off. The
+    configuration is restored afterwards.
+    """
+    import utils
+    import yfinance
+    import benchmark_pipeline
+
+    monkeypatch.setattr(utils, 'PORTFOLIO_FILE', utils.PORTFOLIO_FILE)
+    # Modules hold references to utils.secrets, so its entries are restored in place
+    for key, value in utils.secrets.items():
+        monkeypatch.setitem(utils.secrets, key, value)
+    monkeypatch.setenv('INVESTMENT_DATA_DIR', str(tmp_path / 'data'))
+    _clear_config_caches()
+    benchmark_pipeline.configure(str(tmp_path), 10)
+    for config in utils.get_setting('rate_limits').values():
+        config['max_retries'] = 0
+
+    services = benchmark_pipeline.StandIns()
+    monkeypatch.setattr(yfinance, 'download', services.download)
+    yield services
+    _clear_config_caches()
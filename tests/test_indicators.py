@@ -0,0 +1,55 @@
+# test_indicators.py
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from indicators import compute_indicators, update_indicators, compute_panel_indicators
+
+SPECS = [('sma', 20), ('ema', 20), ('rsi', 14), ('macd', 12, 26, 9), ('bollinger', 20, 2),
+         ('atr', 14), ('atr_wilder', 14)]
+
+
+def prices(bars, seed, with_range=True):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+    df = pd.DataFrame({'Close': close}, index=pd.date_range('2026-01-01', periods=bars, freq='D'))
+    if with_range:
+        df['High'] = close * (1 + rng.uniform(0, 0.02, bars))
+        df['Low'] = close * (1 - rng.uniform(0, 0.02, bars))
+    return df
+
+
+def test_update_indicators_matches_full_recompute():
+    df = prices(300, seed=1)
+    full = compute_indicators(df, SPECS)
+
+    block, state = compute_indicators(df.iloc[:250], SPECS, return_state=True)
+    blocks = [block]
+    for start, end in ((250, 251), (251, 280), (280, 300)):
+        block, state = update_indicators(df.iloc[start:end], state)
+        blocks.append(block)
+
+    assert_frame_equal(pd.concat(blocks), full, rtol=1e-9)
+    assert state['rows'] == 300
+
+
+def test_panel_and_incremental_results_match_per_asset():
+    # Different history lengths, and one asset without high/low (no ATR columns)
+    frames = {
+        'AAPL': prices(260, seed=2),
+        'BTC': prices(330, seed=3),
+        'SPY': prices(90, seed=4, with_range=False),
+    }
+    history = {asset: df.iloc[:-10] for asset, df in frames.items()}
+    panel = compute_panel_indicators(history, SPECS, return_state=True)
+
+    for asset, df in frames.items():
+        block, state = compute_indicators(history[asset], SPECS, return_state=True)
+        panel_block, panel_state = panel[asset]
+        assert_frame_equal(panel_block, block, rtol=1e-9)
+
+        # Continuing from the panel's state or the per-asset one gives the full result
+        expected = compute_indicators(df, SPECS).iloc[-10:]
+        assert_frame_equal(update_indicators(df.iloc[-10:], panel_state)[0], expected, rtol=1e-9)
+        assert_frame_equal(update_indicators(df.iloc[-10:], state)[0], expected, rtol=1e-9)
+        assert ('ATR_Wilder_14' in expected.columns) == (asset != 'SPY')
@@ -0,0 +1,101 @@
+# test_news.py
+
+import asyncio
+import httpx
+import pandas as pd
+import pytest
+from fetch_data import build_news_query, batch_news_queries, route_article, fetch_news_bulk
+from news_store import claim_new_articles, read_last_published
+from storage import get_news_path
+
+
+def article(title, url, published='2026-10-17T12:00:00Z', description=None):
+    return {'title': title, 'description': description, 'url': url, 'publishedAt': published}
+
+
+def test_build_news_query():
+    assert build_news_query(['TSLA']) == "TSLA stock"
+    assert build_news_query(['TSLA', 'NVDA']) == '("TSLA" OR "NVDA") AND stock'
+
+
+def test_batch_news_queries_respects_size_and_query_length():
+    assets = [f"STK{i:03d}" for i in range(25)]
+    batches = batch_news_queries(assets, 10)
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert sum(batches, []) == assets
+
+    long_names = [f"{'X' * 60}{i}" for i in range(20)]
+    batches = batch_news_queries(long_names, 20)
+    assert len(batches) > 1
+    assert all(len(build_news_query(batch)) <= 500 for batch in batches)
+
+
+def test_route_article_ignores_case_and_matches_whole_words():
+    crypto = ['bitcoin', 'ethereum', 'solana']
+    assert route_article({'title': "Bitcoin tops $70k as Ethereum, Solana rally"}, crypto) == crypto
+    assert route_article({'title': "Why $TSLA and nvda moved"}, ['TSLA', 'NVDA', 'SPY']) == ['TSLA', 'NVDA']
+    assert route_article({'title': "Spyware firm raises funds"}, ['SPY']) == []
+    assert route_article({'title': "Markets", 'content': "... VOO inflows ..."}, ['VOO']) == ['VOO']
+
+
+def test_claim_new_articles_skips_seen_urls_and_reposts(data_dir):
+    first = [
+        article("Tesla deliveries beat", "https://news.example.com/a/?utm_source=feed"),
+        article("Tesla deliveries beat", "https://mirror.example.org/a-copy"),
+        article("Tesla cuts prices", "https://news.example.com/b", published='2026-10-17T15:00:00Z'),
+    ]
+    new = claim_new_articles('TSLA', first)
+    assert [a['url'] for a in new] == ["https://news.example.com/a/?utm_source=feed", "https://news.example.com/b"]
+
+    again = [
+        article("Tesla deliveries beat (updated)", "https://NEWS.example.com/a#comments"),
+        article("Tesla opens factory", "https://news.example.com/c", published='2026-10-18T09:00:00Z'),
+    ]
+    assert [a['url'] for a in claim_new_articles('TSLA', again)] == ["https://news.example.com/c"]
+    # The seen-set is per asset: another asset may store the same article
+    assert len(claim_new_articles('NVDA', first)) == 2
+    assert read_last_published(['TSLA', 'NVDA', 'SPY']) == {
+        'TSLA': '2026-10-18T09:00:00Z', 'NVDA': '2026-10-17T15:00:00Z'}
+
+
+
+def test_articles_stay_unseen_when_the_news_file_is_not_written(data_dir):
+    articles = [article("Tesla deliveries beat", "https://news.example.com/a")]
+
+    def failing_write(new_articles):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        claim_new_articles('TSLA', articles, store=failing_write)
+    assert read_last_published(['TSLA']) == {}
+    assert len(claim_new_articles('TSLA', articles)) == 1
+
+def test_crowded_out_assets_are_queried_again(stand_ins):
+    import http_client
+
+    queries = []
+
+    async def busy_ticker(request):
+        # Every page comes back full and about the first symbol of the query only
+        query = request.url.params['q']
+        queries.append(query)
+        symbol = query.split('"')[1] if '"' in query else query.split()[0]
+        size = int(request.url.params['pageSize'])
+        articles = [article(f"{symbol} headline {i}", f"https://example.com/{symbol}/{i}",
+                            published=f"2026-10-17T{i % 24:02d}:00:00Z") for i in range(size)]
+        return httpx.Response(200, json={'status': 'ok', 'totalResults': 1000, 'articles': articles})
+
+    async def fetch(assets):
+        http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(busy_ticker))
+        try:
+            return await fetch_news_bulk(assets, limit=5)
+        finally:
+            await http_client.close_http_clients()
+
+    stocks = ['STK0000', 'STK0001', 'STK0003', 'STK0005']
+    assert asyncio.run(fetch(stocks)) == set(stocks)
+    # One batch, then smaller batches for the assets it crowded out, down to one query each
+    assert queries[0] == '("STK0000" OR "STK0001" OR "STK0003" OR "STK0005") AND stock'
+    assert sorted(queries[1:]) == ['("STK0001" OR "STK0003") AND stock', "STK0003 stock", "STK0005 stock"]
+    for asset in stocks:
+        assert len(pd.read_csv(get_news_path(asset))) == 5
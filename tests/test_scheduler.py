@@ -0,0 +1,90 @@
+# test_scheduler.py
+
+import asyncio
+import httpx
+from checkpoints import CheckpointStore
+from scheduler import Stage, StageGraph
+
+
+def test_failed_stage_is_not_checkpointed(data_dir):
+    calls = []
+    healthy = {'send': False}
+
+    async def fetch(asset, inputs):
+        calls.append('fetch')
+        return 'data'
+
+    async def send(asset, inputs):
+        calls.append('send')
+        if not healthy['send']:
+            raise RuntimeError("provider returned 500")
+
+    graph = StageGraph([
+        Stage('fetch', fetch),
+        Stage('send', send, requires=('fetch',)),
+    ])
+
+    outputs = {}
+    asyncio.run(graph.run('AAPL', ('fetch', 'send'), outputs, CheckpointStore.load()))
+    assert 'send' not in outputs
+
+    # A rerun resumes the successful stage and repeats the failed one
+    healthy['send'] = True
+    outputs = {}
+    asyncio.run(graph.run('AAPL', ('fetch', 'send'), outputs, CheckpointStore.load()))
+    assert calls == ['fetch', 'send', 'send']
+    assert 'send' in outputs
+
+    # Once both succeeded, nothing runs again
+    asyncio.run(graph.run('AAPL', ('fetch', 'send'), {}, CheckpointStore.load()))
+    assert calls == ['fetch', 'send', 'send']
+
+
+def test_daily_run_repeats_failed_fetches_and_notifications(stand_ins):
+    import daily_run
+    from assets import list_assets
+    from benchmark_pipeline import _run_job
+
+    failing = {'newsapi.org', 'api.telegram.org'}
+    handle = stand_ins.handle
+
+    async def flaky(request):
+        if request.url.host in failing:
+            return httpx.Response(500, json={'error': 'unavailable'})
+        return await handle(request)
+
+    stand_ins.handle = flaky
+    first = asyncio.run(_run_job(daily_run.main, stand_ins))
+    assets = len(list_assets())
+    assert first['stages']['fetch_news']['errors'] == assets
+    assert first['stages']['notify']['errors'] == assets
+    assert 'newsapi' not in first['requests'] and 'telegram' not in first['requests']
+
+    # With the providers healthy again, only the failed stages run
+    failing.clear()
+    second = asyncio.run(_run_job(daily_run.main, stand_ins))
+    assert second['errors'] == 0
+    assert second['requests'].get('newsapi', 0) > 0
+    assert second['requests']['telegram'] == assets
+    assert second['stages']['fetch_news']['calls'] == assets
+    assert second['stages']['notify']['calls'] == assets
+    assert second['stages']['fetch_prices']['skipped'] == assets
+    assert 'yfinance' not in second['requests']
+
+
+def test_panel_failure_falls_back_to_per_asset_processing(stand_ins, monkeypatch):
+    import utils
+    import daily_run
+    from assets import list_assets
+    from benchmark_pipeline import _run_job
+
+    async def broken_panel(assets, process_pool=None):
+        raise MemoryError("panel too large")
+
+    utils.get_settings()['settings']['indicator_mode'] = 'panel'
+    monkeypatch.setattr(daily_run, 'process_panel', broken_panel)
+    report = asyncio.run(_run_job(daily_run.main, stand_ins))
+    assets = len(list_assets())
+    assert report['stages']['process']['calls'] == assets
+    assert report['stages']['snapshot']['calls'] == assets
+    assert report['stages']['notify']['calls'] == assets